@@ -1,3 +1,5 @@
+import click
+from datetime import timedelta
 from flask import Flask
 from config import Config
 from routes.main_routes import configure_main_routes
@@ -7,6 +9,14 @@ from routes.admin_routes import configure_admin_routes
 from routes.produto_routes import configure_produto_routes
 from routes.carrinho_routes import configure_carrinho_routes
 from utils.helpers import from_json_filter
+from utils.imagens import url_miniatura, aplicar_cache_imutavel
+from utils.uploads import RequisicaoStreaming
+from utils.tarefas import iniciar_tarefa_periodica
+from models.database import fechar_db
+from models.produto import deduplicar_imagens_legadas, coletar_imagens_orfas
+from models.pedido import expirar_reservas
+from models.carrinho import obter_armazem, gravar_carrinhos_pendentes, compactar_carrinhos_abandonados
+from models.relatorios import atualizar_relatorios, reconstruir_vendas_diarias
 from routes.avaliacao_routes import avaliacao_bp
 import os
 
@@ -14,7 +24,48 @@ def create_app():
     app = Flask(__name__, template_folder="view", static_folder="static")
     app.config.from_object(Config)
     
+    # Uploads gravados em disco bloco a bloco, sem manter o corpo inteiro em memória
+    app.request_class = RequisicaoStreaming
+    
     app.jinja_env.filters['from_json'] = from_json_filter
+    app.jinja_env.filters['miniatura'] = url_miniatura
+    
+    # Devolver ao pool a conexão usada pela requisição
+    app.teardown_appcontext(fechar_db)
+    
+    # Uploads endereçados por conteúdo: cache longo e imutável no navegador
+    app.after_request(aplicar_cache_imutavel)
+    
+    @app.cli.command('imagens-deduplicar')
+    def imagens_deduplicar():
+        """Migra uploads antigos para nomes por hash de conteúdo"""
+        renomeadas = deduplicar_imagens_legadas()
+        print(f"✅ {len(renomeadas)} arquivo(s) migrado(s) para {len(set(renomeadas.values()))} nome(s) por conteúdo")
+    
+    @app.cli.command('imagens-limpar')
+    def imagens_limpar():
+        """Apaga uploads que nenhum produto referencia"""
+        removidas = coletar_imagens_orfas()
+        print(f"🧹 {len(removidas)} imagem(ns) órfã(s) removida(s)")
+    
+    @app.cli.command('relatorios-reconstruir')
+    def relatorios_reconstruir():
+        """Recalcula do zero as tabelas de resumo dos relatórios"""
+        atualizar_relatorios(completo=True)
+        print("✅ Resumos dos relatórios recalculados")
+    
+    @app.cli.command('vendas-diarias-reconstruir')
+    @click.option('--inicio', type=click.DateTime(formats=['%Y-%m-%d']), help='primeiro dia (padrão: primeiro pedido)')
+    @click.option('--fim', type=click.DateTime(formats=['%Y-%m-%d']), help='último dia (padrão: hoje)')
+    @click.option('--dias-por-lote', type=click.IntRange(min=1), default=Config.RELATORIOS_BACKFILL_DIAS_POR_LOTE, show_default=True)
+    def vendas_diarias_reconstruir(inicio, fim, dias_por_lote):
+        """Refaz o resumo diário de vendas a partir do histórico, em lotes de dias"""
+        lotes = reconstruir_vendas_diarias(inicio.date() if inicio else None,
+                                           fim.date() + timedelta(days=1) if fim else None,
+                                           dias_por_lote)
+        for lote_inicio, lote_fim in lotes:
+            print(f"📅 {lote_inicio:%d/%m/%Y} a {lote_fim - timedelta(days=1):%d/%m/%Y} recalculado")
+        print("✅ Vendas diárias reconstruídas")
     
     # Configurar rotas
     configure_main_routes(app)
@@ -26,6 +77,19 @@ def create_app():
     
     # REGISTRAR BLUEPRINT DAS AVALIAÇÕES ← NOVA LINHA
     app.register_blueprint(avaliacao_bp)
+    
+    # Pedidos PIX não pagos no prazo devolvem o estoque reservado
+    iniciar_tarefa_periodica('expirar_reservas', Config.RESERVA_VERIFICACAO_SEGUNDOS, expirar_reservas)
+    iniciar_tarefa_periodica('limpar_carrinhos', 3600, lambda: obter_armazem().limpar_expirados())
+    
+    # Carrinhos de clientes: gravação em lote e compactação dos abandonados
+    iniciar_tarefa_periodica('gravar_carrinhos', Config.CARRINHO_GRAVACAO_SEGUNDOS, gravar_carrinhos_pendentes)
+    iniciar_tarefa_periodica('compactar_carrinhos', Config.CARRINHO_COMPACTACAO_SEGUNDOS, compactar_carrinhos_abandonados)
+    
+    # Resumos dos relatórios administrativos (só os meses/produtos/clientes com pedidos alterados);
+    # a primeira execução é imediata para que um deploy novo não mostre relatórios zerados
+    iniciar_tarefa_periodica('relatorios', Config.RELATORIOS_ATUALIZACAO_SEGUNDOS, atualizar_relatorios,
+                             imediata=True)
 
     os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
     
@@ -23,6 +23,16 @@ DROP TABLE IF EXISTS cupons;
 DROP TABLE IF EXISTS ofertas;
 DROP TABLE IF EXISTS pagamentos;
 DROP TABLE IF EXISTS empresas;
+DROP TABLE IF EXISTS produto_imagens;
+DROP TABLE IF EXISTS produto_avaliacao_resumo;
+DROP TABLE IF EXISTS carrinho_cliente;
+DROP TABLE IF EXISTS produtos_comprados;
+DROP TABLE IF EXISTS relatorio_mensal;
+DROP TABLE IF EXISTS relatorio_produtos;
+DROP TABLE IF EXISTS relatorio_clientes;
+DROP TABLE IF EXISTS relatorio_controle;
+DROP TABLE IF EXISTS vendas_diarias;
+DROP TABLE IF EXISTS vendas_mensais;
 DROP TABLE IF EXISTS produto;
 DROP TABLE IF EXISTS concorrentes;
 DROP TABLE IF EXISTS suporte;
@@ -51,6 +61,16 @@ CREATE TABLE produto (
     INDEX idx_estoque (estoque)
 );
 
+-- Imagens do produto em linhas (espelho da coluna JSON produto.imagens)
+CREATE TABLE produto_imagens (
+    id_imagem INT PRIMARY KEY AUTO_INCREMENT,
+    id_produto INT NOT NULL,
+    arquivo VARCHAR(255) NOT NULL,
+    ordem INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+    INDEX idx_produto_imagens_ordem (id_produto, ordem)
+);
+
 -- Tabela clientes
 CREATE TABLE clientes (
     id_cliente INT PRIMARY KEY AUTO_INCREMENT,
@@ -138,11 +158,16 @@ CREATE TABLE pedidos (
     forma_pagamento VARCHAR(50),
     codigo_rastreio VARCHAR(100),
     observacoes TEXT,
+    reserva_expira_em DATETIME NULL,
+    pix_txid VARCHAR(25) NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
     FOREIGN KEY (id_endereco) REFERENCES enderecos(id_endereco) ON DELETE SET NULL,
     INDEX idx_cliente (id_cliente),
     INDEX idx_status (status),
-    INDEX idx_data (data_pedido)
+    INDEX idx_data (data_pedido),
+    INDEX idx_status_reserva (status, reserva_expira_em),
+    UNIQUE INDEX idx_pedidos_pix_txid (pix_txid)
 );
 
 -- Tabela itens_pedido
@@ -183,7 +208,7 @@ CREATE TABLE avaliacoes (
     titulo VARCHAR(200),
     comentario TEXT,
     data_avaliacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    aprovado BOOLEAN DEFAULT TRUE,
+    aprovado BOOLEAN DEFAULT FALSE,
     tipo_avaliador ENUM('cliente', 'empresa') DEFAULT 'cliente',
     FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
     FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
@@ -191,9 +216,25 @@ CREATE TABLE avaliacoes (
     UNIQUE KEY unique_avaliacao_cliente (id_cliente, id_produto),
     UNIQUE KEY unique_avaliacao_empresa (id_empresa, id_produto),
     INDEX idx_produto (id_produto),
+    INDEX idx_avaliacoes_produto_data (id_produto, aprovado, data_avaliacao),
+    INDEX idx_avaliacoes_aprovado (aprovado),
     INDEX idx_nota (nota)
 );
 
+-- Resumo das avaliações aprovadas por produto (recalculado pela moderação)
+CREATE TABLE produto_avaliacao_resumo (
+    id_produto INT PRIMARY KEY,
+    total_avaliacoes INT NOT NULL DEFAULT 0,
+    soma_notas INT NOT NULL DEFAULT 0,
+    cinco_estrelas INT NOT NULL DEFAULT 0,
+    quatro_estrelas INT NOT NULL DEFAULT 0,
+    tres_estrelas INT NOT NULL DEFAULT 0,
+    duas_estrelas INT NOT NULL DEFAULT 0,
+    uma_estrela INT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE
+);
+
 -- Tabela de avaliações de empresas
 CREATE TABLE avaliacoes_empresas (
     id_avaliacao INT PRIMARY KEY AUTO_INCREMENT,
@@ -234,6 +275,85 @@ CREATE TABLE carrinho_abandonado (
     FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE
 );
 
+-- Carrinho atual dos clientes logados (gravado em lote, fora da requisição)
+CREATE TABLE carrinho_cliente (
+    id_cliente INT NOT NULL,
+    id_produto INT NOT NULL,
+    quantidade INT NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_cliente, id_produto),
+    FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+    FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+    INDEX idx_carrinho_cliente_atualizado (atualizado_em)
+);
+
+-- Produtos que cada cliente já comprou (pedido concluído/entregue), para liberar avaliações
+CREATE TABLE produtos_comprados (
+    id_cliente INT NOT NULL,
+    id_produto INT NOT NULL,
+    id_pedido INT NOT NULL,
+    data_compra TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id_cliente, id_produto),
+    FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+    FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE
+);
+
+-- Resumos dos relatórios administrativos (recalculados a partir de pedidos.atualizado_em)
+CREATE TABLE relatorio_mensal (
+    ano SMALLINT NOT NULL,
+    mes TINYINT NOT NULL,
+    total_pedidos INT NOT NULL DEFAULT 0,
+    receita_total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    clientes_unicos INT NOT NULL DEFAULT 0,
+    pedidos_cancelados INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ano, mes)
+);
+
+CREATE TABLE relatorio_produtos (
+    id_produto INT PRIMARY KEY,
+    total_vendido INT NOT NULL DEFAULT 0,
+    receita_total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+    INDEX idx_relatorio_produtos_vendido (total_vendido)
+);
+
+CREATE TABLE relatorio_clientes (
+    id_cliente INT PRIMARY KEY,
+    total_pedidos INT NOT NULL DEFAULT 0,
+    total_gasto DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    ultima_compra TIMESTAMP NULL,
+    FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+    INDEX idx_relatorio_clientes_gasto (total_gasto)
+);
+
+-- Vendas por dia e categoria (categoria '' = total do dia), base dos relatórios por período
+CREATE TABLE vendas_diarias (
+    dia DATE NOT NULL,
+    categoria VARCHAR(100) NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    receita DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    itens INT NOT NULL DEFAULT 0,
+    cancelamentos INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, categoria),
+    INDEX idx_vendas_diarias_categoria (categoria, dia)
+);
+
+CREATE TABLE vendas_mensais (
+    mes DATE NOT NULL,
+    categoria VARCHAR(100) NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    receita DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    itens INT NOT NULL DEFAULT 0,
+    cancelamentos INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, categoria),
+    INDEX idx_vendas_mensais_categoria (categoria, mes)
+);
+
+CREATE TABLE relatorio_controle (
+    nome VARCHAR(50) PRIMARY KEY,
+    atualizado_ate DATETIME NULL
+);
+
 -- Tabela cupons
 CREATE TABLE cupons (
     id_cupom INT PRIMARY KEY AUTO_INCREMENT,
@@ -439,15 +559,6 @@ BEGIN
     END IF;
 END//
 
-CREATE TRIGGER after_pedido_insert
-AFTER INSERT ON itens_pedido
-FOR EACH ROW
-BEGIN
-    UPDATE produto 
-    SET estoque = estoque - NEW.quantidade 
-    WHERE id_produto = NEW.id_produto;
-END//
-
 CREATE TRIGGER after_pedido_cancel
 AFTER UPDATE ON pedidos
 FOR EACH ROW
@@ -460,6 +571,18 @@ BEGIN
     END IF;
 END//
 
+CREATE TRIGGER after_pedido_compra
+AFTER UPDATE ON pedidos
+FOR EACH ROW
+BEGIN
+    IF NEW.status IN ('concluido', 'entregue') AND OLD.status NOT IN ('concluido', 'entregue') THEN
+        INSERT IGNORE INTO produtos_comprados (id_cliente, id_produto, id_pedido)
+        SELECT NEW.id_cliente, ip.id_produto, NEW.id_pedido
+        FROM itens_pedido ip
+        WHERE ip.id_pedido = NEW.id_pedido;
+    END IF;
+END//
+
 CREATE TRIGGER after_funcionario_login
 AFTER UPDATE ON funcionarios
 FOR EACH ROW
@@ -483,14 +606,16 @@ DELIMITER //
 
 CREATE PROCEDURE sp_estatisticas_vendas(IN data_inicio DATE, IN data_fim DATE)
 BEGIN
+    -- Totais somados de vendas_diarias; só os clientes únicos vêm de pedidos (intervalo indexado)
     SELECT 
-        COUNT(*) as total_pedidos,
-        SUM(total) as receita_total,
-        AVG(total) as ticket_medio,
-        COUNT(DISTINCT id_cliente) as clientes_unicos
-    FROM pedidos
-    WHERE DATE(data_pedido) BETWEEN data_inicio AND data_fim
-    AND status != 'cancelado';
+        COALESCE(SUM(v.pedidos), 0) as total_pedidos,
+        COALESCE(SUM(v.receita), 0) as receita_total,
+        COALESCE(SUM(v.receita) / NULLIF(SUM(v.pedidos), 0), 0) as ticket_medio,
+        (SELECT COUNT(DISTINCT id_cliente) FROM pedidos
+         WHERE data_pedido >= data_inicio AND data_pedido < data_fim + INTERVAL 1 DAY
+         AND status != 'cancelado') as clientes_unicos
+    FROM vendas_diarias v
+    WHERE v.categoria = '' AND v.dia BETWEEN data_inicio AND data_fim;
 END//
 
 CREATE PROCEDURE sp_aumento_preco_categoria(IN categoria_nome VARCHAR(100), IN percentual DECIMAL(5,2))
@@ -533,6 +658,19 @@ CREATE INDEX idx_clientes_data_cadastro ON clientes(data_cadastro);
 CREATE INDEX idx_itens_pedido_preco ON itens_pedido(preco_unitario);
 CREATE INDEX idx_produtos_empresa_empresa ON produtos_empresa(id_empresa);
 CREATE INDEX idx_produtos_empresa_produto ON produtos_empresa(id_produto);
+-- Paginação por cursor do catálogo (keyset em data_cadastro, id_produto)
+CREATE INDEX idx_produto_ativo_data ON produto(ativo, data_cadastro, id_produto);
+CREATE INDEX idx_produto_categoria_data ON produto(categoria, ativo, data_cadastro, id_produto);
+-- Listagem paginada de produtos do painel (inclui inativos)
+CREATE INDEX idx_produto_data ON produto(data_cadastro, id_produto);
+CREATE INDEX idx_produto_categoria_data_admin ON produto(categoria, data_cadastro, id_produto);
+-- Busca textual com ranking de relevância
+CREATE FULLTEXT INDEX ft_produto_nome ON produto(nome);
+CREATE FULLTEXT INDEX ft_produto_busca ON produto(nome, descricao);
+-- Pedidos alterados desde a última atualização dos relatórios
+CREATE INDEX idx_pedidos_atualizado ON pedidos(atualizado_em);
+-- Alerta de estoque baixo do dashboard
+CREATE INDEX idx_produto_ativo_estoque ON produto(ativo, estoque);
 
 
 
@@ -0,0 +1,176 @@
+"""
+Teste de carga do checkout: várias threads finalizando pedidos ao mesmo tempo
+sobre os mesmos produtos, contra um MySQL local com o schema de banco.sql.
+
+Cada pedido leva 1 unidade de alguns produtos "quentes", em ordem aleatória no
+carrinho (para provar que a ordem de travas evita deadlocks). Ao final confere
+que nenhum produto ficou com estoque negativo e que as unidades vendidas batem
+exatamente com o estoque baixado.
+
+Uso:
+    python benchmarks/checkout_concorrente.py --database loja_informatica_teste \\
+        --threads 32 --pedidos 2000 --estoque 500 --produtos 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+import mysql.connector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.pedido import criar_pedido, ErroCheckout  # noqa: E402
+
+ERRO_DEADLOCK = 1213
+ERRO_LOCK_TIMEOUT = 1205
+
+
+def conectar(args):
+    return mysql.connector.connect(host=args.host, port=args.port, user=args.user,
+                                   password=args.password, database=args.database)
+
+
+def preparar(args):
+    """Cria um cliente e os produtos do teste; retorna (id_cliente, ids dos produtos)"""
+    conn = conectar(args)
+    cursor = conn.cursor()
+    marca = uuid.uuid4().hex[:10]
+    cursor.execute("""
+        INSERT INTO clientes (nome, email, senha, cpf) VALUES (%s, %s, %s, %s)
+    """, (f'Benchmark {marca}', f'bench-{marca}@teste.local', '-', marca))
+    id_cliente = cursor.lastrowid
+    ids = []
+    for i in range(args.produtos):
+        cursor.execute("""
+            INSERT INTO produto (nome, marca, preco, estoque, categoria, ativo)
+            VALUES (%s, 'Benchmark', 10.00, %s, 'Benchmark', FALSE)
+        """, (f'Produto benchmark {marca}-{i}', args.estoque))
+        ids.append(cursor.lastrowid)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return id_cliente, ids
+
+
+def limpar(args, id_cliente, ids):
+    conn = conectar(args)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM pedidos WHERE id_cliente = %s", (id_cliente,))  # itens em cascata
+    cursor.execute(f"DELETE FROM produto WHERE id_produto IN ({','.join(['%s'] * len(ids))})", ids)
+    cursor.execute("DELETE FROM clientes WHERE id_cliente = %s", (id_cliente,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def trabalhador(args, id_cliente, ids, restantes, resultado, lock):
+    conn = conectar(args)
+    cursor = conn.cursor(dictionary=True)
+    aleatorio = random.Random()
+    while True:
+        with lock:
+            if restantes[0] <= 0:
+                break
+            restantes[0] -= 1
+
+        escolhidos = aleatorio.sample(ids, aleatorio.randint(1, len(ids)))
+        itens = [{'id_produto': i, 'nome': str(i), 'quantidade': 1, 'preco': 10.0} for i in escolhidos]
+        inicio = time.perf_counter()
+        try:
+            criar_pedido(cursor, id_cliente, itens, 'pix', 10.0 * len(itens), minutos_reserva=30)
+            conn.commit()
+            chave = 'confirmados'
+        except ErroCheckout:
+            conn.rollback()
+            chave = 'esgotados'
+        except mysql.connector.Error as err:
+            conn.rollback()
+            chave = 'deadlocks' if err.errno in (ERRO_DEADLOCK, ERRO_LOCK_TIMEOUT) else 'erros'
+        with lock:
+            resultado[chave] += 1
+            resultado['latencias'].append(time.perf_counter() - inicio)
+    cursor.close()
+    conn.close()
+
+
+def conferir(args, ids):
+    """Retorna {id_produto: (estoque final, unidades vendidas)}"""
+    conn = conectar(args)
+    cursor = conn.cursor()
+    marcadores = ','.join(['%s'] * len(ids))
+    cursor.execute(f"""
+        SELECT p.id_produto, p.estoque, COALESCE(SUM(ip.quantidade), 0)
+        FROM produto p
+        LEFT JOIN itens_pedido ip ON ip.id_produto = p.id_produto
+        WHERE p.id_produto IN ({marcadores})
+        GROUP BY p.id_produto, p.estoque
+    """, ids)
+    situacao = {id_produto: (estoque, int(vendidos)) for id_produto, estoque, vendidos in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return situacao
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkouts concorrentes contra um MySQL local')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='loja_informatica')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--pedidos', type=int, default=2000, help='tentativas de checkout no total')
+    parser.add_argument('--estoque', type=int, default=500, help='estoque inicial de cada produto')
+    parser.add_argument('--produtos', type=int, default=3, help='produtos disputados')
+    parser.add_argument('--manter', action='store_true', help='não apaga os dados do teste')
+    args = parser.parse_args()
+
+    id_cliente, ids = preparar(args)
+    resultado = {'confirmados': 0, 'esgotados': 0, 'deadlocks': 0, 'erros': 0, 'latencias': []}
+    restantes = [args.pedidos]
+    lock = threading.Lock()
+
+    threads = [threading.Thread(target=trabalhador, args=(args, id_cliente, ids, restantes, resultado, lock))
+               for _ in range(args.threads)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    situacao = conferir(args, ids)
+    if not args.manter:
+        limpar(args, id_cliente, ids)
+
+    latencias = resultado['latencias']
+    print(f"Threads: {args.threads}  Tentativas: {args.pedidos}  Produtos: {args.produtos} x {args.estoque} un.")
+    print(f"Confirmados: {resultado['confirmados']}  Esgotados: {resultado['esgotados']}  "
+          f"Deadlocks/timeouts: {resultado['deadlocks']}  Outros erros: {resultado['erros']}")
+    print(f"Duração: {duracao:.2f}s  Vazão: {len(latencias) / duracao:.1f} checkouts/s")
+    print(f"Latência p50: {percentil(latencias, 0.5) * 1000:.1f}ms  p95: {percentil(latencias, 0.95) * 1000:.1f}ms  "
+          f"máx: {max(latencias, default=0) * 1000:.1f}ms")
+
+    consistente = True
+    for id_produto, (estoque, vendidos) in sorted(situacao.items()):
+        ok = estoque >= 0 and estoque + vendidos == args.estoque
+        consistente &= ok
+        print(f"  produto {id_produto}: estoque final {estoque}, vendidos {vendidos} {'✅' if ok else '❌ OVERSELL'}")
+
+    sys.exit(0 if consistente and resultado['deadlocks'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,10 +13,43 @@ class Config:
         'database': 'loja_informatica'
     }
     
+    # Pool de conexões
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # segundos aguardando conexão livre
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # tempo de vida máximo (segundos)
+    DB_POOL_PRE_PING = True  # verifica a conexão antes de entregá-la
+    
     # Upload Configuration
     UPLOAD_FOLDER = 'static/uploads/produtos'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    UPLOAD_MAX_ARQUIVO = 8 * 1024 * 1024  # limite por arquivo, conferido durante o recebimento
+    MINIATURAS_LARGURAS = {'p': 240, 'm': 480, 'g': 960}  # variantes geradas por imagem (px)
+    MINIATURAS_QUALIDADE = 82
+    MINIATURAS_WORKERS = int(os.environ.get('MINIATURAS_WORKERS', 2))
+    UPLOADS_CACHE_MAX_AGE = 365 * 24 * 3600  # URLs por hash de conteúdo são imutáveis
+    UPLOADS_CARENCIA_COLETA = 3600  # segundos; arquivos recentes não são apagados (podem estar em uso)
+    
+    # Catálogo
+    PRODUTOS_POR_PAGINA = 24
+    PRODUTOS_POR_PAGINA_MAX = 60
+    CATALOGO_CACHE_TTL = 600  # segundos; invalidado nas gravações de produto
+    BUSCA_FACETAS_TTL = 60
+    VITRINE_CACHE_TTL = 300  # página inicial; também expira à meia-noite (validade das ofertas)
+    PRODUTO_IMAGENS_NORMALIZADAS = os.environ.get('PRODUTO_IMAGENS_NORMALIZADAS', '').lower() in ('1', 'true', 'sim')
+    AVALIACOES_POR_PAGINA = 10  # exibidas na página do produto; as demais vêm do endpoint JSON
+    AVALIACOES_POR_PAGINA_MAX = 50
+    AVALIACOES_MODERACAO_POR_PAGINA = 50
+    
+    # Carrinho (guardado no servidor; o cookie leva só o id)
+    CARRINHO_SQLITE = os.environ.get('CARRINHO_SQLITE', 'carrinhos.sqlite3')
+    CARRINHO_REDIS_URL = os.environ.get('CARRINHO_REDIS_URL')  # ex.: redis://localhost:6379/0
+    CARRINHO_TTL_DIAS = 30
+    CARRINHO_PRODUTOS_TTL = 60  # segundos; também invalidado nas gravações de produto
+    CARRINHO_GRAVACAO_SEGUNDOS = 5  # intervalo do lote que persiste carrinhos de clientes
+    CARRINHO_ABANDONO_HORAS = 24  # parado há mais tempo vai para carrinho_abandonado
+    CARRINHO_COMPACTACAO_SEGUNDOS = 900
     
     # Session Configuration
     SESSION_TYPE = 'filesystem'
@@ -25,4 +58,27 @@ class Config:
     # PIX Configuration
     PIX_CHAVE = "14057629939"
     PIX_NOME = "CAETANO GBUR PETRY"
-    PIX_CIDADE = "JOINVILLE"
\ No newline at end of file
+    PIX_CIDADE = "JOINVILLE"
+    PIX_QR_CACHE = 256  # QR Codes renderizados mantidos em memória (por payload)
+    PIX_QR_PASTA = os.path.join('instance', 'pix')  # PNGs das cobranças por pedido (fora de static)
+    PIX_QR_WORKERS = 2
+    PIX_QR_MAX_AGE = 24 * 3600
+    RESERVA_PIX_MINUTOS = 30  # estoque reservado até o pagamento; depois o pedido é cancelado
+    RESERVA_VERIFICACAO_SEGUNDOS = 60
+    
+    # Painel administrativo
+    DASHBOARD_CACHE_TTL = 15  # segundos; indicadores compartilhados entre os funcionários do mesmo cargo
+    
+    # Relatórios (tabelas de resumo atualizadas em segundo plano)
+    RELATORIOS_ATUALIZACAO_SEGUNDOS = 300
+    RELATORIOS_ESTOQUE_CRITICO = 10  # estoque a partir do qual o produto entra no relatório
+    RELATORIOS_SERIE_DIARIA_MAX_DIAS = 92  # períodos maiores mostram a série agrupada por mês
+    RELATORIOS_BACKFILL_DIAS_POR_LOTE = 31
+
+    # Exportação CSV das listagens do painel
+    EXPORTACAO_LOTE = 1000  # linhas lidas do servidor por vez
+
+    # Listagens paginadas do painel administrativo
+    ADMIN_ITENS_POR_PAGINA = 50
+    ADMIN_ITENS_POR_PAGINA_MAX = 200
+    ADMIN_CONTAGEM_CACHE_TTL = 60  # segundos que o total de cada filtro fica em cache
\ No newline at end of file
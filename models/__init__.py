@@ -3,7 +3,7 @@ Módulo de modelos do sistema GHCP
 Contém as definições de banco de dados, validações e utilitários
 """
 
-from .database import get_db_connection, criar_tabelas_necessarias, criar_admin_padrao
+from .database import get_db_connection, obter_metricas_pool, criar_tabelas_necessarias, criar_admin_padrao
 from .validators import (
     validar_cpf, validar_cnpj, validar_email,
     formatar_cpf, formatar_cnpj, formatar_telefone,
@@ -12,6 +12,7 @@ from .validators import (
 
 __all__ = [
     'get_db_connection',
+    'obter_metricas_pool',
     'criar_tabelas_necessarias', 
     'criar_admin_padrao',
     'validar_cpf',
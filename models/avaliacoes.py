@@ -0,0 +1,214 @@
+"""
+Avaliações de produtos: resumo por produto, listagem paginada e moderação.
+
+A tabela produto_avaliacao_resumo guarda, para cada produto, o total de
+avaliações aprovadas, a soma das notas e o histograma de estrelas. As
+avaliações entram pendentes (aprovado = FALSE) e só contam depois de
+aprovadas na fila de moderação, que aprova ou rejeita em lote e recalcula o
+resumo uma vez por produto afetado; a página do produto e os selos da
+listagem leem só essa linha, sem agregar a tabela avaliacoes.
+
+As avaliações em si são listadas em páginas (cursor em data_avaliacao,
+id_avaliacao), usando o índice (id_produto, aprovado, data_avaliacao). Quem
+pode avaliar é conferido na tabela produtos_comprados, por chave primária.
+"""
+
+from models.database import cursor_db
+
+# Coluna do histograma correspondente a cada nota
+COLUNAS_ESTRELAS = {
+    5: 'cinco_estrelas',
+    4: 'quatro_estrelas',
+    3: 'tres_estrelas',
+    2: 'duas_estrelas',
+    1: 'uma_estrela',
+}
+
+_CAMPOS = 'total_avaliacoes, soma_notas, ' + ', '.join(COLUNAS_ESTRELAS.values())
+
+
+def _resumo_vazio():
+    return {'media': 0, 'total_avaliacoes': 0, **{coluna: 0 for coluna in COLUNAS_ESTRELAS.values()}}
+
+
+def _montar_resumo(linha):
+    total = int(linha['total_avaliacoes'])
+    resumo = {coluna: int(linha[coluna]) for coluna in COLUNAS_ESTRELAS.values()}
+    resumo['total_avaliacoes'] = total
+    resumo['media'] = float(linha['soma_notas']) / total if total else 0
+    return resumo
+
+
+def recalcular_resumos(cursor, ids_produto):
+    """Refaz o resumo dos produtos informados a partir das avaliações aprovadas (um único comando)"""
+    ids = sorted(set(int(id_produto) for id_produto in ids_produto))
+    if not ids:
+        return 0
+    histograma = ', '.join(f"COALESCE(SUM(a.nota = {nota}), 0)" for nota in COLUNAS_ESTRELAS)
+    atualizacao = ', '.join(f"{campo} = VALUES({campo})" for campo in _CAMPOS.split(', '))
+    cursor.execute(f"""
+        INSERT INTO produto_avaliacao_resumo (id_produto, {_CAMPOS})
+        SELECT p.id_produto, COUNT(a.id_avaliacao), COALESCE(SUM(a.nota), 0), {histograma}
+        FROM produto p
+        LEFT JOIN avaliacoes a ON a.id_produto = p.id_produto AND a.aprovado = TRUE
+        WHERE p.id_produto IN ({','.join(['%s'] * len(ids))})
+        GROUP BY p.id_produto
+        ON DUPLICATE KEY UPDATE {atualizacao}
+    """, ids)
+    return len(ids)
+
+
+def obter_resumos(cursor, ids_produto):
+    """{id_produto: resumo} dos produtos que já têm avaliações aprovadas (busca pela chave primária)"""
+    ids = list(set(ids_produto))
+    if not ids:
+        return {}
+    cursor.execute(f"""
+        SELECT id_produto, {_CAMPOS} FROM produto_avaliacao_resumo
+        WHERE id_produto IN ({','.join(['%s'] * len(ids))}) AND total_avaliacoes > 0
+    """, ids)
+    colunas = [coluna[0] for coluna in cursor.description]
+    resumos = {}
+    for linha in cursor.fetchall():
+        linha = linha if isinstance(linha, dict) else dict(zip(colunas, linha))
+        resumos[linha['id_produto']] = _montar_resumo(linha)
+    return resumos
+
+
+def obter_resumo_avaliacoes(id_produto):
+    """Média, total e histograma de estrelas do produto (zerados se ainda não houver avaliações)"""
+    with cursor_db(dictionary=True) as cursor:
+        return obter_resumos(cursor, [id_produto]).get(id_produto) or _resumo_vazio()
+
+
+def anexar_resumos(cursor, produtos):
+    """Preenche produto['avaliacao'] (ou None) para os selos de nota da listagem"""
+    resumos = obter_resumos(cursor, [produto['id_produto'] for produto in produtos])
+    for produto in produtos:
+        produto['avaliacao'] = resumos.get(produto['id_produto'])
+    return produtos
+
+
+def listar_avaliacoes_produto(id_produto, limite, apos=None):
+    """Página de avaliações aprovadas, das mais recentes para as mais antigas.
+
+    Paginação por cursor em (data_avaliacao, id_avaliacao): `apos` é o cursor da
+    última avaliação já exibida. Retorna (avaliacoes, cursor da próxima página ou None).
+    """
+    query = """
+        SELECT a.id_avaliacao, a.nota, a.titulo, a.comentario, a.data_avaliacao,
+               c.nome AS cliente_nome
+        FROM avaliacoes a
+        JOIN clientes c ON a.id_cliente = c.id_cliente
+        WHERE a.id_produto = %s AND a.aprovado = TRUE
+    """
+    params = [id_produto]
+    if apos and apos.get('data') and apos.get('id'):
+        query += " AND (a.data_avaliacao < %s OR (a.data_avaliacao = %s AND a.id_avaliacao < %s))"
+        params.extend([apos['data'], apos['data'], apos['id']])
+    query += " ORDER BY a.data_avaliacao DESC, a.id_avaliacao DESC LIMIT %s"
+    params.append(limite + 1)
+
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute(query, params)
+        avaliacoes = cursor.fetchall()
+
+    proxima = None
+    if len(avaliacoes) > limite:
+        avaliacoes = avaliacoes[:limite]
+        ultima = avaliacoes[-1]
+        proxima = {'data': ultima['data_avaliacao'], 'id': ultima['id_avaliacao']}
+    return avaliacoes, proxima
+
+
+def listar_avaliacoes_pendentes(limite, apos=None):
+    """Fila de moderação: avaliações pendentes, das mais antigas para as mais novas.
+
+    Paginação por cursor em id_avaliacao (índice em aprovado, que já leva a chave
+    primária). Retorna (avaliacoes, cursor da próxima página ou None).
+    """
+    query = """
+        SELECT a.id_avaliacao, a.id_produto, a.nota, a.titulo, a.comentario, a.data_avaliacao,
+               a.tipo_avaliador, p.nome AS produto_nome,
+               COALESCE(e.nome_fantasia, e.razao_social, c.nome) AS autor
+        FROM avaliacoes a
+        JOIN produto p ON p.id_produto = a.id_produto
+        LEFT JOIN clientes c ON c.id_cliente = a.id_cliente
+        LEFT JOIN empresas e ON e.id_empresa = a.id_empresa
+        WHERE a.aprovado = FALSE
+    """
+    params = []
+    if apos and apos.get('id'):
+        query += " AND a.id_avaliacao > %s"
+        params.append(apos['id'])
+    query += " ORDER BY a.id_avaliacao LIMIT %s"
+    params.append(limite + 1)
+
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute(query, params)
+        avaliacoes = cursor.fetchall()
+
+    proxima = None
+    if len(avaliacoes) > limite:
+        avaliacoes = avaliacoes[:limite]
+        proxima = {'id': avaliacoes[-1]['id_avaliacao']}
+    return avaliacoes, proxima
+
+
+def contar_avaliacoes_pendentes():
+    with cursor_db() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM avaliacoes WHERE aprovado = FALSE")
+        return cursor.fetchone()[0]
+
+
+def moderar_avaliacoes(ids_avaliacao, aprovar):
+    """Aprova (ou rejeita, apagando) as avaliações pendentes informadas, em uma transação.
+
+    Cada ação é um único comando sobre a lista inteira; na aprovação o resumo é
+    recalculado uma vez para cada produto afetado. Retorna quantas foram alteradas.
+    """
+    ids = sorted(set(int(id_avaliacao) for id_avaliacao in ids_avaliacao))
+    if not ids:
+        return 0
+    marcadores = ','.join(['%s'] * len(ids))
+    with cursor_db(commit=True) as cursor:
+        if not aprovar:
+            cursor.execute(f"DELETE FROM avaliacoes WHERE id_avaliacao IN ({marcadores}) AND aprovado = FALSE", ids)
+            return cursor.rowcount
+
+        cursor.execute(f"""
+            SELECT DISTINCT id_produto FROM avaliacoes
+            WHERE id_avaliacao IN ({marcadores}) AND aprovado = FALSE
+            FOR UPDATE
+        """, ids)
+        produtos = [linha[0] for linha in cursor.fetchall()]
+        cursor.execute(f"UPDATE avaliacoes SET aprovado = TRUE WHERE id_avaliacao IN ({marcadores}) AND aprovado = FALSE", ids)
+        alteradas = cursor.rowcount
+        recalcular_resumos(cursor, produtos)
+    return alteradas
+
+
+# Elegibilidade: produtos_comprados tem uma linha por (cliente, produto) pago,
+# gravada pelo trigger after_pedido_compra quando o pedido passa a concluído/entregue
+
+
+def cliente_comprou_produto(id_cliente, id_produto):
+    """Se o cliente tem pedido pago com o produto (busca pela chave primária)"""
+    with cursor_db() as cursor:
+        cursor.execute("""
+            SELECT 1 FROM produtos_comprados WHERE id_cliente = %s AND id_produto = %s
+        """, (id_cliente, id_produto))
+        return cursor.fetchone() is not None
+
+
+def listar_produtos_para_avaliar(id_cliente, cursor):
+    """Produtos comprados pelo cliente que ele ainda não avaliou"""
+    cursor.execute("""
+        SELECT p.id_produto, p.nome, p.marca, p.categoria, p.imagens, p.imagem
+        FROM produtos_comprados pc
+        JOIN produto p ON p.id_produto = pc.id_produto
+        LEFT JOIN avaliacoes a ON a.id_cliente = pc.id_cliente AND a.id_produto = pc.id_produto
+        WHERE pc.id_cliente = %s AND a.id_avaliacao IS NULL
+        ORDER BY pc.data_compra DESC
+    """, (id_cliente,))
+    return cursor.fetchall()
@@ -0,0 +1,58 @@
+"""
+Busca textual do catálogo usando os índices FULLTEXT de produto.
+
+A collation padrão das colunas (utf8mb4, accent/case insensitive) já faz
+o "dobramento" de acentos: 'memoria' encontra 'memória'.
+"""
+
+import re
+
+# innodb_ft_min_token_size padrão: termos menores não entram no índice FULLTEXT
+TAMANHO_MINIMO_TERMO = 3
+MAXIMO_TERMOS = 8
+
+# Palavras muito comuns que não ajudam a filtrar (e não devem ser exigidas)
+PALAVRAS_IGNORADAS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na',
+    'nos', 'nas', 'um', 'uma', 'para', 'com', 'por', 'sem',
+}
+
+# Relevância: ocorrências no nome pesam o dobro das ocorrências na descrição
+EXPRESSAO_RELEVANCIA = (
+    "(MATCH(nome) AGAINST (%s IN NATURAL LANGUAGE MODE) * 2"
+    " + MATCH(nome, descricao) AGAINST (%s IN NATURAL LANGUAGE MODE))"
+)
+
+
+def extrair_termos(busca):
+    """Quebra o texto digitado em termos, descartando operadores do modo booleano"""
+    termos = [t for t in re.findall(r'\w+', (busca or '').lower()) if t not in PALAVRAS_IGNORADAS]
+    return termos[:MAXIMO_TERMOS]
+
+
+def montar_filtro_busca(busca):
+    """Retorna (condição SQL, parâmetros) exigindo todos os termos, com casamento por prefixo"""
+    termos = extrair_termos(busca)
+    if not termos:
+        return None, []
+
+    indexaveis = [t for t in termos if len(t) >= TAMANHO_MINIMO_TERMO]
+    curtos = [t for t in termos if len(t) < TAMANHO_MINIMO_TERMO]
+
+    condicoes = []
+    params = []
+    if indexaveis:
+        condicoes.append("MATCH(nome, descricao) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(' '.join(f'+{t}*' for t in indexaveis))
+    # Termos curtos (ex.: "pc", "hd") não estão no índice; procurados apenas no nome
+    for termo in curtos:
+        condicoes.append("nome LIKE %s")
+        params.append(f"%{termo}%")
+
+    return ' AND '.join(condicoes), params
+
+
+def montar_relevancia(busca):
+    """Retorna (expressão SQL de relevância, parâmetros) para ORDER BY"""
+    texto = ' '.join(extrair_termos(busca))
+    return EXPRESSAO_RELEVANCIA, [texto, texto]
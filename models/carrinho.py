@@ -0,0 +1,320 @@
+"""
+Carrinho guardado no servidor.
+
+O cookie de sessão leva só o id do carrinho (session['carrinho_id']); o
+conteúdo é um dict {id_produto: quantidade} salvo em um armazém local (SQLite)
+ou em Redis, quando CARRINHO_REDIS_URL estiver configurado. Nome, preço e
+imagens dos produtos são preenchidos na hora de exibir, a partir de um cache
+de produtos em memória.
+
+Carrinhos de clientes logados também vão para a tabela carrinho_cliente, mas
+sem bloquear a requisição: cada alteração só substitui o último estado
+pendente daquele cliente em memória, e uma tarefa periódica grava todos os
+pendentes de uma vez (write-behind). Carrinhos parados há mais de
+CARRINHO_ABANDONO_HORAS são movidos em lote para carrinho_abandonado.
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import session
+from mysql.connector import Error
+
+from config import Config
+from models.database import cursor_db
+from models.produto import mapear_produtos
+from utils.cache import CacheTTL
+
+cache_produtos_carrinho = CacheTTL(ttl=Config.CARRINHO_PRODUTOS_TTL, max_itens=4096)
+
+
+class ArmazemCarrinhoSQLite:
+    """Carrinhos em um arquivo SQLite local (uma conexão por thread)"""
+
+    def __init__(self, caminho, ttl):
+        self.caminho = caminho
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS carrinhos (
+                    id TEXT PRIMARY KEY,
+                    itens TEXT NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+            """)
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def obter(self, id_carrinho):
+        linha = self._conexao().execute(
+            "SELECT itens FROM carrinhos WHERE id = ? AND atualizado_em > ?",
+            (id_carrinho, time.time() - self.ttl)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else {}
+
+    def salvar(self, id_carrinho, itens):
+        with self._conexao() as conn:
+            conn.execute("""
+                INSERT INTO carrinhos (id, itens, atualizado_em) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET itens = excluded.itens, atualizado_em = excluded.atualizado_em
+            """, (id_carrinho, json.dumps(itens), time.time()))
+
+    def remover(self, id_carrinho):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM carrinhos WHERE id = ?", (id_carrinho,))
+
+    def limpar_expirados(self):
+        with self._conexao() as conn:
+            return conn.execute("DELETE FROM carrinhos WHERE atualizado_em <= ?", (time.time() - self.ttl,)).rowcount
+
+
+class ArmazemCarrinhoRedis:
+    """Carrinhos em Redis (expiração feita pelo próprio Redis)"""
+
+    def __init__(self, url, ttl):
+        import redis
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    def _chave(self, id_carrinho):
+        return f'carrinho:{id_carrinho}'
+
+    def obter(self, id_carrinho):
+        bruto = self.cliente.get(self._chave(id_carrinho))
+        return json.loads(bruto) if bruto else {}
+
+    def salvar(self, id_carrinho, itens):
+        self.cliente.setex(self._chave(id_carrinho), self.ttl, json.dumps(itens))
+
+    def remover(self, id_carrinho):
+        self.cliente.delete(self._chave(id_carrinho))
+
+    def limpar_expirados(self):
+        return 0
+
+
+_armazem = None
+_lock_armazem = threading.Lock()
+
+
+def obter_armazem():
+    """Armazém de carrinhos do processo, criado no primeiro uso"""
+    global _armazem
+    if _armazem is None:
+        with _lock_armazem:
+            if _armazem is None:
+                ttl = Config.CARRINHO_TTL_DIAS * 24 * 3600
+                if Config.CARRINHO_REDIS_URL:
+                    _armazem = ArmazemCarrinhoRedis(Config.CARRINHO_REDIS_URL, ttl)
+                else:
+                    _armazem = ArmazemCarrinhoSQLite(Config.CARRINHO_SQLITE, ttl)
+    return _armazem
+
+
+def _normalizar(itens):
+    # JSON só tem chaves texto; o carrinho usa ids inteiros
+    return {int(id_produto): int(quantidade) for id_produto, quantidade in itens.items() if int(quantidade) > 0}
+
+
+def carrinho_atual():
+    """Dict {id_produto: quantidade} do carrinho da sessão"""
+    legado = session.pop('carrinho', None)
+    if legado:
+        # Carrinho antigo, guardado inteiro no cookie: migra para o armazém
+        itens = {}
+        for item in legado:
+            itens[int(item['id_produto'])] = itens.get(int(item['id_produto']), 0) + int(item['quantidade'])
+        salvar_carrinho(itens)
+        return itens
+
+    id_carrinho = session.get('carrinho_id')
+    if not id_carrinho:
+        return {}
+    return _normalizar(obter_armazem().obter(id_carrinho))
+
+
+def salvar_carrinho(itens):
+    """Grava o carrinho da sessão (criando o id na primeira gravação)"""
+    itens = _normalizar(itens)
+    id_carrinho = session.get('carrinho_id')
+    if session.get('usuario_id'):
+        agendar_gravacao(session['usuario_id'], itens)
+    if not itens:
+        if id_carrinho:
+            obter_armazem().remover(id_carrinho)
+        return
+    if not id_carrinho:
+        id_carrinho = session['carrinho_id'] = uuid.uuid4().hex
+    obter_armazem().salvar(id_carrinho, {str(id_produto): quantidade for id_produto, quantidade in itens.items()})
+
+
+def esvaziar_carrinho():
+    salvar_carrinho({})
+
+
+def _carregar_produtos(ids):
+    placeholders = ','.join(['%s'] * len(ids))
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute(f"""
+            SELECT id_produto, nome, preco, categoria, estoque, imagens, imagem
+            FROM produto WHERE id_produto IN ({placeholders}) AND ativo = TRUE
+        """, list(ids))
+        produtos = mapear_produtos(cursor.fetchall(), cursor)
+    for produto in produtos:
+        produto['preco'] = float(produto['preco'])
+        # Produto antigo sem a lista de imagens: usa a imagem única
+        if not produto['imagens'] and produto.get('imagem'):
+            produto['imagens'] = [produto['imagem']]
+    return {produto['id_produto']: produto for produto in produtos}
+
+
+def obter_produtos(ids):
+    """Dados dos produtos por id, do cache; os que faltam vêm do banco em uma consulta"""
+    produtos = {}
+    faltando = []
+    for id_produto in ids:
+        produto = cache_produtos_carrinho.obter(id_produto)
+        if produto is None:
+            faltando.append(id_produto)
+        else:
+            produtos[id_produto] = produto
+    if faltando:
+        for id_produto, produto in _carregar_produtos(faltando).items():
+            cache_produtos_carrinho.definir(id_produto, produto)
+            produtos[id_produto] = produto
+    return produtos
+
+
+def itens_carrinho(itens=None):
+    """Linhas do carrinho prontas para os templates (nome, preço, imagens e quantidade)"""
+    itens = carrinho_atual() if itens is None else itens
+    if not itens:
+        return []
+    produtos = obter_produtos(list(itens))
+    return [
+        {**produtos[id_produto], 'quantidade': quantidade}
+        for id_produto, quantidade in itens.items()
+        if id_produto in produtos
+    ]
+
+
+def invalidar_produtos_carrinho():
+    """Descarta os dados de produtos em cache (chamado após gravar um produto)"""
+    cache_produtos_carrinho.invalidar()
+
+
+# Persistência dos carrinhos de clientes (write-behind)
+
+_pendentes = {}
+# Lote retirado de _pendentes cuja transação ainda não terminou; continua visível
+# para carregar_carrinho_cliente até o commit, senão um login nesse intervalo não
+# encontraria o carrinho nem na memória nem no banco.
+_em_gravacao = {}
+_lock_pendentes = threading.Lock()
+
+
+def agendar_gravacao(id_cliente, itens):
+    """Guarda o último estado do carrinho do cliente para a próxima gravação em lote"""
+    with _lock_pendentes:
+        _pendentes[int(id_cliente)] = dict(itens)
+
+
+def gravar_carrinhos_pendentes():
+    """Grava em uma transação todos os carrinhos alterados desde a última execução"""
+    global _pendentes
+    with _lock_pendentes:
+        lote, _pendentes = _pendentes, {}
+        _em_gravacao.update(lote)
+    if not lote:
+        return 0
+
+    clientes = list(lote)
+    linhas = [(id_cliente, id_produto, quantidade)
+              for id_cliente, itens in lote.items()
+              for id_produto, quantidade in itens.items()]
+    try:
+        with cursor_db(commit=True) as cursor:
+            cursor.execute(f"""
+                DELETE FROM carrinho_cliente WHERE id_cliente IN ({','.join(['%s'] * len(clientes))})
+            """, clientes)
+            if linhas:
+                # IGNORE: produto excluído nesse meio tempo não derruba o lote inteiro
+                cursor.executemany("""
+                    INSERT IGNORE INTO carrinho_cliente (id_cliente, id_produto, quantidade)
+                    VALUES (%s, %s, %s)
+                """, linhas)
+    except Error:
+        # Devolve o lote para a fila sem sobrescrever alterações mais novas
+        with _lock_pendentes:
+            for id_cliente, itens in lote.items():
+                _pendentes.setdefault(id_cliente, itens)
+        raise
+    finally:
+        with _lock_pendentes:
+            for id_cliente, itens in lote.items():
+                # Só remove se outro lote não assumiu o cliente nesse meio tempo
+                if _em_gravacao.get(id_cliente) is itens:
+                    del _em_gravacao[id_cliente]
+    return len(lote)
+
+
+def carregar_carrinho_cliente(id_cliente):
+    """Último carrinho salvo do cliente (estado pendente ou em gravação, ou tabela carrinho_cliente)"""
+    with _lock_pendentes:
+        pendente = _pendentes.get(int(id_cliente))
+        if pendente is None:
+            pendente = _em_gravacao.get(int(id_cliente))
+    if pendente is not None:
+        return dict(pendente)
+    with cursor_db() as cursor:
+        cursor.execute("SELECT id_produto, quantidade FROM carrinho_cliente WHERE id_cliente = %s", (id_cliente,))
+        return {id_produto: quantidade for id_produto, quantidade in cursor.fetchall()}
+
+
+def associar_carrinho_cliente(id_cliente):
+    """No login: junta o carrinho da visita com o carrinho salvo do cliente (vale entre dispositivos)"""
+    atual = carrinho_atual()
+    try:
+        salvo = carregar_carrinho_cliente(id_cliente)
+    except Error as err:
+        print(f"❌ Erro ao carregar carrinho salvo do cliente {id_cliente}: {err}")
+        salvo = {}
+    for id_produto, quantidade in atual.items():
+        salvo[id_produto] = max(salvo.get(id_produto, 0), quantidade)
+    salvar_carrinho(salvo)
+
+
+def compactar_carrinhos_abandonados():
+    """Move em lote para carrinho_abandonado os carrinhos parados há mais de CARRINHO_ABANDONO_HORAS"""
+    with cursor_db(commit=True) as cursor:
+        cursor.execute("SELECT NOW() - INTERVAL %s HOUR", (Config.CARRINHO_ABANDONO_HORAS,))
+        limite = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO carrinho_abandonado (id_cliente, id_produto, quantidade, data_adicao)
+            SELECT id_cliente, id_produto, quantidade, atualizado_em
+            FROM carrinho_cliente
+            WHERE atualizado_em < %s
+        """, (limite,))
+        movidos = cursor.rowcount
+        cursor.execute("DELETE FROM carrinho_cliente WHERE atualizado_em < %s", (limite,))
+    return movidos
+
+
+@atexit.register
+def _gravar_ao_encerrar():
+    try:
+        gravar_carrinhos_pendentes()
+    except Error as err:
+        print(f"❌ Carrinhos pendentes não gravados ao encerrar: {err}")
@@ -0,0 +1,83 @@
+"""
+Cache em memória do catálogo: facetas (categorias/marcas) e totais de listagem.
+Os dados só mudam quando um administrador grava um produto, então as rotas
+de escrita chamam invalidar_catalogo() e o resto do tempo tudo sai da memória.
+"""
+
+from config import Config
+from models.database import cursor_db
+from models.busca import montar_filtro_busca
+from utils.cache import CacheTTL
+
+cache_catalogo = CacheTTL(ttl=Config.CATALOGO_CACHE_TTL, max_itens=512)
+
+
+def _carregar_matriz(busca=None):
+    """Agrupa os produtos ativos por (categoria, marca) com contagem e faixa de preço"""
+    where = "ativo = TRUE"
+    filtro_busca, params = montar_filtro_busca(busca)
+    if filtro_busca:
+        where += f" AND {filtro_busca}"
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute(f"""
+            SELECT categoria, marca, COUNT(*) AS total,
+                   MIN(preco) AS preco_minimo, MAX(preco) AS preco_maximo
+            FROM produto WHERE {where}
+            GROUP BY categoria, marca
+        """, params)
+        return cursor.fetchall()
+
+
+def obter_matriz_facetas(busca=None):
+    """Matriz (categoria, marca) do catálogo inteiro ou dos resultados de uma busca"""
+    if busca:
+        return cache_catalogo.obter_ou_calcular(('facetas_busca', busca), lambda: _carregar_matriz(busca),
+                                                ttl=Config.BUSCA_FACETAS_TTL)
+    return cache_catalogo.obter_ou_calcular(('facetas',), _carregar_matriz)
+
+
+def _agrupar(linhas, campo):
+    grupos = {}
+    for linha in linhas:
+        chave = linha[campo]
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupos[chave] = {
+                campo: chave,
+                'total_produtos': linha['total'],
+                'preco_minimo': linha['preco_minimo'],
+                'preco_maximo': linha['preco_maximo'],
+            }
+        else:
+            grupo['total_produtos'] += linha['total']
+            grupo['preco_minimo'] = min(grupo['preco_minimo'], linha['preco_minimo'])
+            grupo['preco_maximo'] = max(grupo['preco_maximo'], linha['preco_maximo'])
+    return sorted(grupos.values(), key=lambda g: g[campo] or '')
+
+
+def listar_categorias():
+    """Categorias ativas com total de produtos (equivalente ao GROUP BY categoria)"""
+    return _agrupar(obter_matriz_facetas(), 'categoria')
+
+
+def listar_marcas():
+    """Marcas ativas com total de produtos e faixa de preço (equivalente ao GROUP BY marca)"""
+    return _agrupar(obter_matriz_facetas(), 'marca')
+
+
+def contar_facetas(categoria=None, marca=None, busca=None):
+    """Contagens por categoria e por marca respeitando os demais filtros aplicados"""
+    linhas = obter_matriz_facetas(busca)
+    categorias = {}
+    marcas = {}
+    for linha in linhas:
+        if not marca or linha['marca'] == marca:
+            categorias[linha['categoria']] = categorias.get(linha['categoria'], 0) + linha['total']
+        if not categoria or linha['categoria'] == categoria:
+            marcas[linha['marca']] = marcas.get(linha['marca'], 0) + linha['total']
+    return {'categorias': categorias, 'marcas': marcas}
+
+
+def invalidar_catalogo():
+    """Descarta facetas e totais em cache (chamado após gravar um produto)"""
+    cache_catalogo.invalidar()
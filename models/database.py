@@ -1,15 +1,95 @@
+import threading
+from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context
 from werkzeug.security import generate_password_hash
 from config import Config
+from models.pool import PoolConexoes
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obter_pool():
+    """Retorna o pool de conexões, criando-o no primeiro uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(
+                    Config.DB_CONFIG,
+                    tamanho=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    tempo_vida=Config.DB_POOL_RECYCLE,
+                    verificar_conexao=Config.DB_POOL_PRE_PING
+                )
+    return _pool
+
+def obter_metricas_pool():
+    """Métricas do pool (conexões em uso, aguardando, latência de checkout)"""
+    return obter_pool().metricas()
 
 def get_db_connection():
     try:
-        return mysql.connector.connect(**Config.DB_CONFIG)
+        return obter_pool().obter()
     except Error as err:
         print(f"Erro ao conectar ao banco de dados: {err}")
         return None
 
+def obter_db():
+    """Conexão da requisição atual: obtida do pool no primeiro uso e devolvida no teardown"""
+    conn = g.get('_db_conexao')
+    if conn is None or conn.devolvida:
+        conn = obter_pool().obter()
+        g._db_conexao = conn
+    return conn
+
+def fechar_db(exc=None):
+    """Devolve ao pool a conexão da requisição (registrado no teardown do app)"""
+    conn = g.pop('_db_conexao', None)
+    if conn is not None:
+        conn.close()
+
+@contextmanager
+def cursor_db(dictionary=False, commit=False):
+    """Cursor sobre a conexão da requisição; faz commit opcional, rollback em erro e sempre fecha o cursor"""
+    dedicada = not has_app_context()
+    conn = obter_pool().obter() if dedicada else obter_db()
+    cursor = conn.cursor(dictionary=dictionary)
+    try:
+        yield cursor
+        if commit:
+            conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Error:
+            pass
+        raise
+    finally:
+        cursor.close()
+        if dedicada:
+            conn.close()
+
+def garantir_indice(cursor, tabela, nome, colunas, tipo=''):
+    """Cria o índice se ele ainda não existir na tabela"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (tabela, nome))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"CREATE {tipo} INDEX {nome} ON {tabela} ({colunas})")
+
+def garantir_coluna(cursor, tabela, nome, definicao):
+    """Adiciona a coluna se ela ainda não existir na tabela"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (tabela, nome))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {nome} {definicao}")
+
 def criar_tabelas_necessarias():
     """Cria tabelas que podem estar faltando no banco de dados"""
     try:
@@ -53,6 +133,213 @@ def criar_tabelas_necessarias():
             )
         """)
         
+        # A baixa de estoque é feita pelo checkout em um único UPDATE; o trigger por linha
+        # de itens_pedido baixaria o estoque uma segunda vez
+        cursor.execute("DROP TRIGGER IF EXISTS after_pedido_insert")
+        
+        # Prazo da reserva de estoque dos pedidos PIX
+        garantir_coluna(cursor, 'pedidos', 'reserva_expira_em', 'DATETIME NULL')
+        garantir_indice(cursor, 'pedidos', 'idx_status_reserva', 'status, reserva_expira_em')
+        
+        # txid único da cobrança PIX de cada pedido (conciliação pelo índice)
+        garantir_coluna(cursor, 'pedidos', 'pix_txid', 'VARCHAR(25) NULL')
+        garantir_indice(cursor, 'pedidos', 'idx_pedidos_pix_txid', 'pix_txid', tipo='UNIQUE')
+        
+        # Imagens do produto em linhas (lidas no lugar do JSON com PRODUTO_IMAGENS_NORMALIZADAS)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS produto_imagens (
+                id_imagem INT AUTO_INCREMENT PRIMARY KEY,
+                id_produto INT NOT NULL,
+                arquivo VARCHAR(255) NOT NULL,
+                ordem INT NOT NULL DEFAULT 0,
+                FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+                INDEX idx_produto_imagens_ordem (id_produto, ordem)
+            )
+        """)
+        if Config.PRODUTO_IMAGENS_NORMALIZADAS:
+            # Copia as listas JSON dos produtos que ainda não têm linhas na tabela
+            cursor.execute("""
+                INSERT INTO produto_imagens (id_produto, arquivo, ordem)
+                SELECT p.id_produto, j.arquivo, j.ordem - 1
+                FROM produto p,
+                     JSON_TABLE(p.imagens, '$[*]' COLUMNS (
+                         ordem FOR ORDINALITY,
+                         arquivo VARCHAR(255) PATH '$'
+                     )) j
+                WHERE p.imagens IS NOT NULL
+                AND NOT EXISTS (SELECT 1 FROM produto_imagens pi WHERE pi.id_produto = p.id_produto)
+            """)
+        
+        # Carrinho atual dos clientes logados (gravado em lote pelo write-behind do carrinho)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS carrinho_cliente (
+                id_cliente INT NOT NULL,
+                id_produto INT NOT NULL,
+                quantidade INT NOT NULL,
+                atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id_cliente, id_produto),
+                FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+                FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+                INDEX idx_carrinho_cliente_atualizado (atualizado_em)
+            )
+        """)
+        
+        # Resumo das avaliações por produto (lido pela página do produto e pelos selos da listagem)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS produto_avaliacao_resumo (
+                id_produto INT PRIMARY KEY,
+                total_avaliacoes INT NOT NULL DEFAULT 0,
+                soma_notas INT NOT NULL DEFAULT 0,
+                cinco_estrelas INT NOT NULL DEFAULT 0,
+                quatro_estrelas INT NOT NULL DEFAULT 0,
+                tres_estrelas INT NOT NULL DEFAULT 0,
+                duas_estrelas INT NOT NULL DEFAULT 0,
+                uma_estrela INT NOT NULL DEFAULT 0,
+                atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE
+            )
+        """)
+        # Preenche o resumo dos produtos que já tinham avaliações antes da tabela existir
+        cursor.execute("""
+            INSERT INTO produto_avaliacao_resumo
+                (id_produto, total_avaliacoes, soma_notas, cinco_estrelas, quatro_estrelas,
+                 tres_estrelas, duas_estrelas, uma_estrela)
+            SELECT a.id_produto, COUNT(*), SUM(a.nota), SUM(a.nota = 5), SUM(a.nota = 4),
+                   SUM(a.nota = 3), SUM(a.nota = 2), SUM(a.nota = 1)
+            FROM avaliacoes a
+            WHERE a.aprovado = TRUE
+            AND NOT EXISTS (SELECT 1 FROM produto_avaliacao_resumo r WHERE r.id_produto = a.id_produto)
+            GROUP BY a.id_produto
+        """)
+
+        # Paginação das avaliações do produto por (data_avaliacao, id_avaliacao); o InnoDB
+        # acrescenta a chave primária ao índice, então o desempate também sai dele
+        garantir_indice(cursor, 'avaliacoes', 'idx_avaliacoes_produto_data', 'id_produto, aprovado, data_avaliacao')
+        # Avaliações novas entram pendentes de moderação
+        cursor.execute("ALTER TABLE avaliacoes ALTER COLUMN aprovado SET DEFAULT FALSE")
+        # Fila de moderação (pendentes em ordem de id)
+        garantir_indice(cursor, 'avaliacoes', 'idx_avaliacoes_aprovado', 'aprovado')
+        
+        # Produtos comprados por cliente (elegibilidade das avaliações), mantida por trigger
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS produtos_comprados (
+                id_cliente INT NOT NULL,
+                id_produto INT NOT NULL,
+                id_pedido INT NOT NULL,
+                data_compra TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id_cliente, id_produto),
+                FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+                FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.triggers
+            WHERE trigger_schema = DATABASE() AND trigger_name = 'after_pedido_compra'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+                CREATE TRIGGER after_pedido_compra
+                AFTER UPDATE ON pedidos
+                FOR EACH ROW
+                BEGIN
+                    IF NEW.status IN ('concluido', 'entregue') AND OLD.status NOT IN ('concluido', 'entregue') THEN
+                        INSERT IGNORE INTO produtos_comprados (id_cliente, id_produto, id_pedido)
+                        SELECT NEW.id_cliente, ip.id_produto, NEW.id_pedido
+                        FROM itens_pedido ip
+                        WHERE ip.id_pedido = NEW.id_pedido;
+                    END IF;
+                END
+            """)
+            # Primeira execução: preenche com o histórico de pedidos pagos
+            cursor.execute("""
+                INSERT IGNORE INTO produtos_comprados (id_cliente, id_produto, id_pedido, data_compra)
+                SELECT p.id_cliente, ip.id_produto, MIN(p.id_pedido), MIN(p.data_pedido)
+                FROM pedidos p
+                JOIN itens_pedido ip ON ip.id_pedido = p.id_pedido
+                WHERE p.status IN ('concluido', 'entregue')
+                GROUP BY p.id_cliente, ip.id_produto
+            """)
+        
+        # Alerta de estoque baixo do dashboard
+        garantir_indice(cursor, 'produto', 'idx_produto_ativo_estoque', 'ativo, estoque')
+        
+        # Relatórios materializados: pedidos.atualizado_em marca o que mudou desde a última atualização
+        garantir_coluna(cursor, 'pedidos', 'atualizado_em',
+                        'TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP')
+        garantir_indice(cursor, 'pedidos', 'idx_pedidos_atualizado', 'atualizado_em')
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS relatorio_mensal (
+                ano SMALLINT NOT NULL,
+                mes TINYINT NOT NULL,
+                total_pedidos INT NOT NULL DEFAULT 0,
+                receita_total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                clientes_unicos INT NOT NULL DEFAULT 0,
+                pedidos_cancelados INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (ano, mes)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS relatorio_produtos (
+                id_produto INT PRIMARY KEY,
+                total_vendido INT NOT NULL DEFAULT 0,
+                receita_total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                FOREIGN KEY (id_produto) REFERENCES produto(id_produto) ON DELETE CASCADE,
+                INDEX idx_relatorio_produtos_vendido (total_vendido)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS relatorio_clientes (
+                id_cliente INT PRIMARY KEY,
+                total_pedidos INT NOT NULL DEFAULT 0,
+                total_gasto DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                ultima_compra TIMESTAMP NULL,
+                FOREIGN KEY (id_cliente) REFERENCES clientes(id_cliente) ON DELETE CASCADE,
+                INDEX idx_relatorio_clientes_gasto (total_gasto)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vendas_diarias (
+                dia DATE NOT NULL,
+                categoria VARCHAR(100) NOT NULL,
+                pedidos INT NOT NULL DEFAULT 0,
+                receita DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                itens INT NOT NULL DEFAULT 0,
+                cancelamentos INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (dia, categoria),
+                INDEX idx_vendas_diarias_categoria (categoria, dia)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vendas_mensais (
+                mes DATE NOT NULL,
+                categoria VARCHAR(100) NOT NULL,
+                pedidos INT NOT NULL DEFAULT 0,
+                receita DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                itens INT NOT NULL DEFAULT 0,
+                cancelamentos INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (mes, categoria),
+                INDEX idx_vendas_mensais_categoria (categoria, mes)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS relatorio_controle (
+                nome VARCHAR(50) PRIMARY KEY,
+                atualizado_ate DATETIME NULL
+            )
+        """)
+        
+        # Índices da paginação por cursor do catálogo
+        garantir_indice(cursor, 'produto', 'idx_produto_ativo_data', 'ativo, data_cadastro, id_produto')
+        garantir_indice(cursor, 'produto', 'idx_produto_categoria_data', 'categoria, ativo, data_cadastro, id_produto')
+        
+        # Índices da listagem paginada de produtos do painel (sem filtro de ativo)
+        garantir_indice(cursor, 'produto', 'idx_produto_data', 'data_cadastro, id_produto')
+        garantir_indice(cursor, 'produto', 'idx_produto_categoria_data_admin', 'categoria, data_cadastro, id_produto')
+        
+        # Índices FULLTEXT da busca do catálogo
+        garantir_indice(cursor, 'produto', 'ft_produto_nome', 'nome', tipo='FULLTEXT')
+        garantir_indice(cursor, 'produto', 'ft_produto_busca', 'nome, descricao', tipo='FULLTEXT')
+        
         conn.commit()
         print("✅ Tabelas verificadas/criadas com sucesso!")
         
@@ -0,0 +1,83 @@
+"""
+Indicadores do dashboard administrativo.
+
+Os números de vendas saem de uma única consulta (subconsultas escalares, com o
+intervalo do dia em forma que usa o índice de data_pedido) e as listas de
+consultas curtas com projeção e LIMIT. O resultado fica em memória por
+DASHBOARD_CACHE_TTL segundos por cargo, então os funcionários com o painel
+aberto ao mesmo tempo compartilham um único cálculo.
+"""
+
+from mysql.connector import Error
+
+from config import Config
+from models.database import cursor_db
+from utils.cache import CacheTTL
+
+CARGOS_VENDAS = ('admin', 'gerente', 'vendedor')
+CARGOS_SUPORTE = ('admin', 'gerente', 'suporte')
+
+_cache_painel = CacheTTL(ttl=Config.DASHBOARD_CACHE_TTL, max_itens=16)
+
+
+def _calcular_metricas(cargo):
+    metricas = {
+        'total_clientes': 0,
+        'total_produtos': 0,
+        'pedidos_hoje': 0,
+        'receita_hoje': 0,
+        'diagnosticos_pendentes': 0,
+        'estoque_baixo': [],
+        'pedidos_recentes': [],
+        'diagnosticos_recentes': [],
+    }
+    with cursor_db(dictionary=True) as cursor:
+        if cargo in CARGOS_VENDAS:
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM produto WHERE ativo = TRUE) AS total_produtos,
+                    (SELECT COUNT(*) FROM clientes WHERE ativo = TRUE) AS total_clientes,
+                    COUNT(*) AS pedidos_hoje,
+                    COALESCE(SUM(CASE WHEN status != 'cancelado' THEN total END), 0) AS receita_hoje
+                FROM pedidos
+                WHERE data_pedido >= CURDATE() AND data_pedido < CURDATE() + INTERVAL 1 DAY
+            """)
+            metricas.update(cursor.fetchone())
+
+            cursor.execute("""
+                SELECT id_produto, nome, estoque, categoria FROM produto
+                WHERE ativo = TRUE AND estoque <= 5
+                ORDER BY estoque ASC LIMIT 5
+            """)
+            metricas['estoque_baixo'] = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT p.id_pedido, p.total, p.status, p.data_pedido, c.nome AS cliente_nome
+                FROM pedidos p
+                JOIN clientes c ON p.id_cliente = c.id_cliente
+                ORDER BY p.data_pedido DESC LIMIT 5
+            """)
+            metricas['pedidos_recentes'] = cursor.fetchall()
+        else:
+            cursor.execute("SELECT COUNT(*) AS total FROM produto WHERE ativo = TRUE")
+            metricas['total_produtos'] = cursor.fetchone()['total']
+
+    if cargo in CARGOS_SUPORTE:
+        # A tabela diagnosticos é opcional nesta base
+        try:
+            with cursor_db(dictionary=True) as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*) AS total FROM diagnosticos WHERE status IN ('recebido', 'em_analise')
+                """)
+                metricas['diagnosticos_pendentes'] = cursor.fetchone()['total']
+                cursor.execute("SELECT * FROM diagnosticos ORDER BY data_entrada DESC LIMIT 5")
+                metricas['diagnosticos_recentes'] = cursor.fetchall()
+        except Error:
+            pass
+
+    return metricas
+
+
+def obter_metricas_dashboard(cargo):
+    """Indicadores visíveis para o cargo, calculados no máximo uma vez a cada DASHBOARD_CACHE_TTL"""
+    return _cache_painel.obter_ou_calcular(('dashboard', cargo), lambda: _calcular_metricas(cargo))
@@ -0,0 +1,116 @@
+"""
+Criação de pedidos a partir do carrinho com operações em conjunto: o estoque
+de todos os itens é conferido em uma consulta, as linhas do pedido entram em
+um INSERT de várias linhas e o estoque é baixado em um único UPDATE. O número
+de idas ao banco não cresce com o tamanho do carrinho.
+
+Reserva de estoque: as linhas dos produtos são travadas (FOR UPDATE) sempre em
+ordem crescente de id_produto, de modo que checkouts concorrentes esperam uns
+pelos outros em vez de entrar em deadlock, e a baixa só acontece se ainda houver
+estoque para todos os itens. Pedidos PIX ficam com a reserva até
+reserva_expira_em; vencido o prazo sem pagamento, expirar_reservas() cancela o
+pedido e o trigger after_pedido_cancel devolve o estoque.
+"""
+
+from models.database import cursor_db
+
+
+class ErroCheckout(Exception):
+    """Falha de negócio na finalização (produto inexistente, estoque insuficiente)"""
+
+    def __init__(self, mensagem, categoria='warning'):
+        super().__init__(mensagem)
+        self.categoria = categoria
+
+
+def agrupar_quantidades(itens):
+    """Soma as quantidades por produto (o mesmo produto pode aparecer mais de uma vez)"""
+    quantidades = {}
+    for item in itens:
+        id_produto = int(item['id_produto'])
+        quantidades[id_produto] = quantidades.get(id_produto, 0) + int(item['quantidade'])
+    if any(quantidade <= 0 for quantidade in quantidades.values()):
+        raise ErroCheckout('⚠️ Quantidade inválida no carrinho.')
+    return quantidades
+
+
+def _placeholders(valores):
+    return ','.join(['%s'] * len(valores))
+
+
+def verificar_estoque(cursor, itens, quantidades):
+    """Trava e confere todos os produtos do carrinho em uma consulta; levanta ErroCheckout se faltar algo"""
+    ids = sorted(quantidades)
+    cursor.execute(f"""
+        SELECT id_produto, nome, estoque FROM produto
+        WHERE id_produto IN ({_placeholders(ids)})
+        ORDER BY id_produto
+        FOR UPDATE
+    """, ids)
+    estoques = {linha['id_produto']: linha for linha in cursor.fetchall()}
+
+    for item in itens:
+        produto = estoques.get(int(item['id_produto']))
+        if not produto:
+            raise ErroCheckout(f"❌ Produto '{item['nome']}' não encontrado.", 'error')
+        if produto['estoque'] < quantidades[produto['id_produto']]:
+            raise ErroCheckout(f"⚠️ Estoque insuficiente de '{produto['nome']}'.")
+
+
+def baixar_estoque(cursor, quantidades):
+    """Decrementa o estoque de todos os produtos em um único UPDATE condicional.
+
+    Só linhas com estoque suficiente são alteradas; se alguma ficou de fora,
+    levanta ErroCheckout (quem chama desfaz a transação).
+    """
+    ids = sorted(quantidades)
+    casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+    params = [valor for id_produto in ids for valor in (id_produto, quantidades[id_produto])]
+    cursor.execute(f"""
+        UPDATE produto SET estoque = estoque - CASE id_produto {casos} END
+        WHERE id_produto IN ({_placeholders(ids)})
+        AND estoque >= CASE id_produto {casos} END
+    """, params + ids + params)
+    if cursor.rowcount != len(ids):
+        raise ErroCheckout('⚠️ O estoque de um dos produtos acabou de se esgotar. Revise seu carrinho.')
+
+
+def criar_pedido(cursor, id_cliente, itens, forma_pagamento, total, minutos_reserva=None, pix_txid=None):
+    """Grava pedido + itens e reserva (baixa) o estoque; retorna o id do pedido.
+
+    Com minutos_reserva, o pedido expira se não for pago nesse prazo; pix_txid
+    identifica a cobrança PIX do pedido. Não faz commit: a transação é de quem chama.
+    """
+    quantidades = agrupar_quantidades(itens)
+
+    # O pedido é inserido antes de travar os produtos: as travas ficam só até o commit
+    cursor.execute("""
+        INSERT INTO pedidos (id_cliente, total, forma_pagamento, status, data_pedido, reserva_expira_em, pix_txid)
+        VALUES (%s, %s, %s, %s, NOW(), IF(%s IS NULL, NULL, NOW() + INTERVAL %s MINUTE), %s)
+    """, (id_cliente, total, forma_pagamento, 'pendente', minutos_reserva, minutos_reserva, pix_txid))
+    pedido_id = cursor.lastrowid
+
+    verificar_estoque(cursor, itens, quantidades)
+    baixar_estoque(cursor, quantidades)
+
+    # executemany do mysql-connector envia um único INSERT com todas as linhas
+    cursor.executemany("""
+        INSERT INTO itens_pedido (id_pedido, id_produto, quantidade, preco_unitario)
+        VALUES (%s, %s, %s, %s)
+    """, [(pedido_id, item['id_produto'], item['quantidade'], item['preco']) for item in itens])
+
+    return pedido_id
+
+
+def expirar_reservas():
+    """Cancela pedidos pendentes com reserva vencida; o trigger de cancelamento devolve o estoque"""
+    with cursor_db(commit=True) as cursor:
+        cursor.execute("""
+            UPDATE pedidos
+            SET status = 'cancelado',
+                observacoes = CONCAT_WS(' ', observacoes, '[Reserva expirada sem pagamento]')
+            WHERE status = 'pendente'
+            AND reserva_expira_em IS NOT NULL
+            AND reserva_expira_em < NOW()
+        """)
+        return cursor.rowcount
@@ -0,0 +1,75 @@
+"""
+Cobranças PIX por pedido.
+
+Cada pedido PIX recebe um txid único (pedidos.pix_txid, indexado), de modo
+que a conciliação encontra o pedido pelo txid do pagamento. O PNG do QR Code
+é renderizado por um worker em segundo plano logo após o checkout e gravado
+em PIX_QR_PASTA; a rota /pix/<pedido_id>.png só serve o arquivo (ou o
+renderiza na hora, se o worker ainda não terminou).
+"""
+
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from models.database import cursor_db
+from utils.qrcode_generator import gerar_png, montar_payload
+
+_executor = ThreadPoolExecutor(max_workers=Config.PIX_QR_WORKERS, thread_name_prefix='pix-qr')
+
+
+def gerar_txid():
+    """Identificador da cobrança: alfanumérico, até 25 caracteres (regra do BR Code)"""
+    return f"GHCP{uuid.uuid4().hex[:21].upper()}"
+
+
+def caminho_qr(txid):
+    return os.path.join(Config.PIX_QR_PASTA, f"{txid}.png")
+
+
+def gravar_qr(txid, valor_total):
+    """Renderiza o QR da cobrança e grava em disco (escrita atômica); retorna o caminho"""
+    caminho = caminho_qr(txid)
+    if not os.path.exists(caminho):
+        os.makedirs(Config.PIX_QR_PASTA, exist_ok=True)
+        # Temporário único: o worker e a rota podem gravar o mesmo QR ao mesmo tempo
+        descritor, temporario = tempfile.mkstemp(dir=Config.PIX_QR_PASTA, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as destino:
+                destino.write(gerar_png(montar_payload(float(valor_total), txid)))
+            os.replace(temporario, caminho)
+        except FileNotFoundError:
+            # Outra gravação concorrente já publicou o arquivo
+            if not os.path.exists(caminho):
+                raise
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    return caminho
+
+
+def agendar_qr(txid, valor_total):
+    """Coloca a renderização do QR na fila do worker (o checkout não espera por ela)"""
+    _executor.submit(gravar_qr, txid, valor_total)
+
+
+def buscar_pedido_pix(id_pedido):
+    """Dados da cobrança de um pedido (id_cliente, total, txid, status)"""
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT id_pedido, id_cliente, total, status, pix_txid
+            FROM pedidos WHERE id_pedido = %s AND pix_txid IS NOT NULL
+        """, (id_pedido,))
+        return cursor.fetchone()
+
+
+def buscar_pedido_por_txid(txid):
+    """Conciliação: pedido correspondente ao txid recebido do PSP (busca pelo índice único)"""
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT id_pedido, id_cliente, total, status, reserva_expira_em
+            FROM pedidos WHERE pix_txid = %s
+        """, (txid,))
+        return cursor.fetchone()
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+
+class ConexaoPool:
+    """Conexão emprestada do pool; close() devolve ao pool em vez de encerrar o socket"""
+
+    def __init__(self, pool, conexao, criada_em):
+        self._pool = pool
+        self._conexao = conexao
+        self._criada_em = criada_em
+        self._devolvida = False
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    @property
+    def devolvida(self):
+        return self._devolvida
+
+    def is_connected(self):
+        # Indica "ainda emprestada", não o estado do socket: as rotas usam
+        # `if conn and conn.is_connected(): conn.close()`, e uma conexão que caiu
+        # no meio da requisição também precisa voltar ao pool (que a descarta no
+        # pre-ping), senão a vaga fica presa para sempre.
+        return not self._devolvida
+
+    def close(self):
+        if self._devolvida:
+            return
+        self._devolvida = True
+        self._pool._devolver(self._conexao, self._criada_em)
+
+
+class PoolConexoes:
+    """Pool de conexões MySQL com overflow, health-check, tempo de vida e métricas"""
+
+    def __init__(self, db_config, tamanho=5, max_overflow=10, timeout=10,
+                 tempo_vida=1800, verificar_conexao=True):
+        self._db_config = db_config
+        self.tamanho = tamanho
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.tempo_vida = tempo_vida
+        self.verificar_conexao = verificar_conexao
+
+        self._livres = deque()
+        self._abertas = 0
+        self._em_uso = 0
+        self._aguardando = 0
+        self._cond = threading.Condition()
+
+        self._total_checkouts = 0
+        self._total_timeouts = 0
+        self._total_descartadas = 0
+        self._tempo_checkout_total = 0.0
+        self._tempo_checkout_max = 0.0
+
+    def _criar_conexao(self):
+        return mysql.connector.connect(**self._db_config), time.monotonic()
+
+    def _encerrar(self, conexao):
+        try:
+            conexao.close()
+        except Error:
+            pass
+
+    def _conexao_valida(self, conexao, criada_em):
+        if self.tempo_vida and time.monotonic() - criada_em > self.tempo_vida:
+            return False
+        if self.verificar_conexao:
+            try:
+                conexao.ping(reconnect=False)
+            except Error:
+                return False
+        return True
+
+    def obter(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        criar = False
+
+        with self._cond:
+            while True:
+                if self._livres:
+                    conexao, criada_em = self._livres.pop()
+                    break
+                if self._abertas < self.tamanho + self.max_overflow:
+                    self._abertas += 1
+                    criar = True
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._total_timeouts += 1
+                    raise PoolError(f"Tempo esgotado aguardando conexão livre no pool ({self.timeout}s)")
+                self._aguardando += 1
+                try:
+                    self._cond.wait(restante)
+                finally:
+                    self._aguardando -= 1
+            self._em_uso += 1
+
+        try:
+            if not criar and not self._conexao_valida(conexao, criada_em):
+                self._encerrar(conexao)
+                with self._cond:
+                    self._total_descartadas += 1
+                criar = True
+            if criar:
+                conexao, criada_em = self._criar_conexao()
+        except Error:
+            with self._cond:
+                self._abertas -= 1
+                self._em_uso -= 1
+                self._cond.notify()
+            raise
+
+        decorrido = time.monotonic() - inicio
+        with self._cond:
+            self._total_checkouts += 1
+            self._tempo_checkout_total += decorrido
+            self._tempo_checkout_max = max(self._tempo_checkout_max, decorrido)
+
+        return ConexaoPool(self, conexao, criada_em)
+
+    def _devolver(self, conexao, criada_em):
+        try:
+            if conexao.in_transaction:
+                conexao.rollback()
+            reutilizar = True
+        except Error:
+            reutilizar = False
+
+        with self._cond:
+            self._em_uso -= 1
+            if reutilizar and len(self._livres) < self.tamanho:
+                self._livres.append((conexao, criada_em))
+                conexao = None
+            else:
+                self._abertas -= 1
+            self._cond.notify()
+
+        if conexao is not None:
+            self._encerrar(conexao)
+
+    def encerrar_todas(self):
+        with self._cond:
+            livres = list(self._livres)
+            self._livres.clear()
+            self._abertas -= len(livres)
+        for conexao, _ in livres:
+            self._encerrar(conexao)
+
+    def metricas(self):
+        with self._cond:
+            return {
+                'tamanho': self.tamanho,
+                'max_overflow': self.max_overflow,
+                'abertas': self._abertas,
+                'livres': len(self._livres),
+                'em_uso': self._em_uso,
+                'aguardando': self._aguardando,
+                'total_checkouts': self._total_checkouts,
+                'total_timeouts': self._total_timeouts,
+                'total_descartadas': self._total_descartadas,
+                'checkout_medio_ms': round(self._tempo_checkout_total / self._total_checkouts * 1000, 3)
+                                     if self._total_checkouts else 0,
+                'checkout_max_ms': round(self._tempo_checkout_max * 1000, 3),
+            }
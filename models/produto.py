@@ -0,0 +1,159 @@
+"""
+Mapeamento de linhas da tabela produto.
+
+A coluna imagens guarda uma lista JSON; aqui ela é decodificada uma única vez
+por linha, com memo pelo texto bruto (as mesmas strings se repetem entre
+requisições). Com PRODUTO_IMAGENS_NORMALIZADAS ligado, as listas vêm da tabela
+produto_imagens e nenhum JSON é decodificado nas listagens.
+
+As referências de produto.imagens também decidem quando um arquivo enviado
+pode ser apagado do disco (o mesmo arquivo pode servir a vários produtos).
+"""
+
+import json
+from functools import lru_cache
+
+from config import Config
+from models.database import cursor_db
+from utils.imagens import (armazenar_por_conteudo, eh_nome_conteudo, idade_upload,
+                           listar_uploads, remover_arquivos_imagem)
+
+
+@lru_cache(maxsize=4096)
+def _decodificar_json_imagens(bruto):
+    try:
+        valor = json.loads(bruto)
+    except (TypeError, ValueError):
+        return ()
+    if isinstance(valor, list):
+        return tuple(valor)
+    return ()
+
+
+def decodificar_imagens(bruto):
+    """Converte o valor da coluna imagens em lista (vazia se ausente ou inválido)"""
+    if not bruto:
+        return []
+    if isinstance(bruto, list):
+        return bruto
+    if isinstance(bruto, (bytes, bytearray)):
+        bruto = bruto.decode('utf-8')
+    return list(_decodificar_json_imagens(bruto))
+
+
+def mapear_produto(linha):
+    """Normaliza uma linha de produto, com 'imagens' já como lista"""
+    if linha is not None:
+        linha['imagens'] = decodificar_imagens(linha.get('imagens'))
+    return linha
+
+
+def mapear_produtos(linhas, cursor=None):
+    """Normaliza várias linhas; com a tabela produto_imagens ativa, busca as imagens em uma consulta"""
+    if Config.PRODUTO_IMAGENS_NORMALIZADAS and cursor is not None and linhas:
+        ids = [linha['id_produto'] for linha in linhas]
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            SELECT id_produto, arquivo FROM produto_imagens
+            WHERE id_produto IN ({placeholders})
+            ORDER BY id_produto, ordem
+        """, ids)
+        imagens = {}
+        for linha in cursor.fetchall():
+            id_produto, arquivo = (linha['id_produto'], linha['arquivo']) if isinstance(linha, dict) else linha
+            imagens.setdefault(id_produto, []).append(arquivo)
+        for linha in linhas:
+            linha['imagens'] = imagens.get(linha['id_produto'], [])
+        return linhas
+
+    for linha in linhas:
+        mapear_produto(linha)
+    return linhas
+
+
+def salvar_imagens_produto(cursor, id_produto, imagens):
+    """Espelha a lista de imagens do produto na tabela produto_imagens (quando ativa)"""
+    if not Config.PRODUTO_IMAGENS_NORMALIZADAS:
+        return
+    cursor.execute("DELETE FROM produto_imagens WHERE id_produto = %s", (id_produto,))
+    if imagens:
+        cursor.executemany("""
+            INSERT INTO produto_imagens (id_produto, arquivo, ordem) VALUES (%s, %s, %s)
+        """, [(id_produto, arquivo, ordem) for ordem, arquivo in enumerate(imagens)])
+
+
+def contar_referencias_imagens(cursor, nomes=None):
+    """Quantas referências (produto.imagens e produto.imagem) cada arquivo possui"""
+    sql = """
+        SELECT arquivo, COUNT(*) AS referencias FROM (
+            SELECT j.arquivo
+            FROM produto p,
+                 JSON_TABLE(p.imagens, '$[*]' COLUMNS (arquivo VARCHAR(255) PATH '$')) j
+            WHERE p.imagens IS NOT NULL
+            UNION ALL
+            SELECT imagem FROM produto WHERE imagem IS NOT NULL AND imagem <> ''
+        ) refs
+    """
+    params = []
+    if nomes:
+        sql += f" WHERE arquivo IN ({','.join(['%s'] * len(nomes))})"
+        params = list(nomes)
+    cursor.execute(sql + " GROUP BY arquivo", params)
+    referencias = {}
+    for linha in cursor.fetchall():
+        arquivo, total = (linha['arquivo'], linha['referencias']) if isinstance(linha, dict) else linha
+        referencias[arquivo] = total
+    return referencias
+
+
+def _pode_apagar(nome, referencias):
+    idade = idade_upload(nome)
+    return not referencias.get(nome) and idade is not None and idade >= Config.UPLOADS_CARENCIA_COLETA
+
+
+def liberar_imagens(cursor, nomes):
+    """Apaga do disco as imagens que nenhum produto referencia mais (chamar após o commit)"""
+    nomes = sorted({nome for nome in nomes if nome})
+    if not nomes:
+        return []
+    referencias = contar_referencias_imagens(cursor, nomes)
+    removidas = [nome for nome in nomes if _pode_apagar(nome, referencias)]
+    for nome in removidas:
+        remover_arquivos_imagem(nome)
+    return removidas
+
+
+def coletar_imagens_orfas():
+    """Varre a pasta de uploads e apaga os arquivos sem nenhuma referência"""
+    with cursor_db() as cursor:
+        referencias = contar_referencias_imagens(cursor)
+    removidas = [nome for nome in listar_uploads() if _pode_apagar(nome, referencias)]
+    for nome in removidas:
+        remover_arquivos_imagem(nome)
+    return removidas
+
+
+def deduplicar_imagens_legadas():
+    """Migra uploads antigos (uuid_nome) para nomes por conteúdo, unificando duplicatas"""
+    renomear = {nome: armazenar_por_conteudo(nome) for nome in listar_uploads() if not eh_nome_conteudo(nome)}
+    if not renomear:
+        return {}
+
+    with cursor_db(dictionary=True, commit=True) as cursor:
+        cursor.execute("""
+            SELECT id_produto, imagens, imagem FROM produto
+            WHERE imagens IS NOT NULL OR imagem IS NOT NULL
+        """)
+        for produto in cursor.fetchall():
+            imagens = decodificar_imagens(produto['imagens'])
+            novas = list(dict.fromkeys(renomear.get(nome, nome) for nome in imagens))
+            imagem = renomear.get(produto['imagem'], produto['imagem'])
+            if novas != imagens or imagem != produto['imagem']:
+                cursor.execute("UPDATE produto SET imagens = %s, imagem = %s WHERE id_produto = %s",
+                               (json.dumps(novas) if novas else None, imagem, produto['id_produto']))
+                salvar_imagens_produto(cursor, produto['id_produto'], novas)
+
+    # Só depois do commit os nomes antigos deixam de ser usados
+    for nome in renomear:
+        remover_arquivos_imagem(nome)
+    return renomear
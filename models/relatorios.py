@@ -0,0 +1,350 @@
+"""
+Relatórios administrativos materializados.
+
+Em vez de reagregar todo o histórico de pedidos a cada visita (as views
+view_relatorios_mensais, view_produtos_mais_vendidos e view_clientes_ativos),
+a página de relatórios lê três tabelas de resumo:
+
+    relatorio_mensal    - pedidos, receita, clientes únicos e cancelamentos por mês
+    relatorio_produtos  - unidades vendidas e receita por produto (sem cancelados)
+    relatorio_clientes  - pedidos, gasto e última compra por cliente (sem cancelados)
+
+Consultas por período usam vendas_diarias, com uma linha por dia e categoria
+(e uma linha de total do dia, categoria ''), e vendas_mensais, a mesma soma por
+mês: os meses inteiros do intervalo saem do resumo mensal e só as sobras nas
+pontas do diário, então qualquer intervalo soma no máximo algumas centenas de
+linhas.
+
+Uma tarefa periódica mantém os resumos: pega os pedidos criados ou alterados
+desde a última execução (pedidos.atualizado_em, indexado) e recalcula só os
+meses, dias, produtos e clientes que eles tocam. Na primeira execução, ou com
+completo=True, tudo é recalculado (vendas_diarias em lotes de dias, pelo
+comando flask vendas-diarias-reconstruir).
+"""
+
+from datetime import date, timedelta
+
+from config import Config
+from models.database import cursor_db
+
+CHAVE_CONTROLE = 'relatorios'
+CATEGORIA_TOTAL = ''  # linha de vendas_diarias com o total do dia
+
+# Releitura de uma pequena janela já processada: pedidos alterados no mesmo
+# segundo da última execução (ou em transações que terminaram depois dela).
+# Recalcular um grupo é idempotente, então reprocessar não causa duplicidade.
+_MARGEM_SEGUNDOS = 60
+
+
+def _marcadores(valores):
+    return ','.join(['%s'] * len(valores))
+
+
+def _mes_seguinte(dia):
+    return date(dia.year + dia.month // 12, dia.month % 12 + 1, 1)
+
+
+def _recalcular_meses(cursor, meses=None):
+    filtro, params = '', []
+    if meses is not None:
+        # Intervalos de data (usam o índice de data_pedido) em vez de YEAR()/MONTH()
+        filtro = ' AND (' + ' OR '.join(['(data_pedido >= %s AND data_pedido < %s)'] * len(meses)) + ')'
+        for ano, mes in meses:
+            params.extend([date(ano, mes, 1), _mes_seguinte(date(ano, mes, 1))])
+    cursor.execute(f"""
+        INSERT INTO relatorio_mensal (ano, mes, total_pedidos, receita_total, clientes_unicos, pedidos_cancelados)
+        SELECT YEAR(data_pedido), MONTH(data_pedido), COUNT(*), COALESCE(SUM(total), 0),
+               COUNT(DISTINCT id_cliente), SUM(status = 'cancelado')
+        FROM pedidos
+        WHERE data_pedido IS NOT NULL{filtro}
+        GROUP BY YEAR(data_pedido), MONTH(data_pedido)
+        ON DUPLICATE KEY UPDATE
+            total_pedidos = VALUES(total_pedidos),
+            receita_total = VALUES(receita_total),
+            clientes_unicos = VALUES(clientes_unicos),
+            pedidos_cancelados = VALUES(pedidos_cancelados)
+    """, params)
+
+
+def _recalcular_produtos(cursor, ids=None):
+    filtro = f" WHERE p.id_produto IN ({_marcadores(ids)})" if ids is not None else ''
+    cursor.execute(f"""
+        INSERT INTO relatorio_produtos (id_produto, total_vendido, receita_total)
+        SELECT p.id_produto, COALESCE(SUM(ip.quantidade), 0), COALESCE(SUM(ip.quantidade * ip.preco_unitario), 0)
+        FROM produto p
+        LEFT JOIN (itens_pedido ip JOIN pedidos ped ON ped.id_pedido = ip.id_pedido AND ped.status != 'cancelado')
+            ON ip.id_produto = p.id_produto{filtro}
+        GROUP BY p.id_produto
+        ON DUPLICATE KEY UPDATE
+            total_vendido = VALUES(total_vendido),
+            receita_total = VALUES(receita_total)
+    """, list(ids or []))
+
+
+def _recalcular_clientes(cursor, ids=None):
+    filtro = f" WHERE c.id_cliente IN ({_marcadores(ids)})" if ids is not None else ''
+    cursor.execute(f"""
+        INSERT INTO relatorio_clientes (id_cliente, total_pedidos, total_gasto, ultima_compra)
+        SELECT c.id_cliente, COUNT(p.id_pedido), COALESCE(SUM(p.total), 0), MAX(p.data_pedido)
+        FROM clientes c
+        LEFT JOIN pedidos p ON p.id_cliente = c.id_cliente AND p.status != 'cancelado'{filtro}
+        GROUP BY c.id_cliente
+        ON DUPLICATE KEY UPDATE
+            total_pedidos = VALUES(total_pedidos),
+            total_gasto = VALUES(total_gasto),
+            ultima_compra = VALUES(ultima_compra)
+    """, list(ids or []))
+
+
+def _recalcular_dias(cursor, inicio, fim):
+    """Refaz vendas_diarias de inicio (inclusive) a fim (exclusive)"""
+    cursor.execute("DELETE FROM vendas_diarias WHERE dia >= %s AND dia < %s", (inicio, fim))
+    cursor.execute("""
+        INSERT INTO vendas_diarias (dia, categoria, pedidos, receita, itens, cancelamentos)
+        SELECT DATE(p.data_pedido), %s,
+               SUM(p.status != 'cancelado'),
+               COALESCE(SUM(CASE WHEN p.status != 'cancelado' THEN p.total END), 0),
+               COALESCE(SUM(CASE WHEN p.status != 'cancelado' THEN
+                   (SELECT SUM(ip.quantidade) FROM itens_pedido ip WHERE ip.id_pedido = p.id_pedido) END), 0),
+               SUM(p.status = 'cancelado')
+        FROM pedidos p
+        WHERE p.data_pedido >= %s AND p.data_pedido < %s
+        GROUP BY DATE(p.data_pedido)
+    """, (CATEGORIA_TOTAL, inicio, fim))
+    cursor.execute("""
+        INSERT INTO vendas_diarias (dia, categoria, pedidos, receita, itens, cancelamentos)
+        SELECT DATE(p.data_pedido), COALESCE(NULLIF(pr.categoria, ''), 'Sem categoria'),
+               COUNT(DISTINCT CASE WHEN p.status != 'cancelado' THEN p.id_pedido END),
+               COALESCE(SUM(CASE WHEN p.status != 'cancelado' THEN ip.quantidade * ip.preco_unitario END), 0),
+               COALESCE(SUM(CASE WHEN p.status != 'cancelado' THEN ip.quantidade END), 0),
+               COUNT(DISTINCT CASE WHEN p.status = 'cancelado' THEN p.id_pedido END)
+        FROM pedidos p
+        JOIN itens_pedido ip ON ip.id_pedido = p.id_pedido
+        JOIN produto pr ON pr.id_produto = ip.id_produto
+        WHERE p.data_pedido >= %s AND p.data_pedido < %s
+        GROUP BY DATE(p.data_pedido), COALESCE(NULLIF(pr.categoria, ''), 'Sem categoria')
+    """, (inicio, fim))
+
+
+def _recalcular_vendas_mensais(cursor, inicio=None, fim=None):
+    """Refaz vendas_mensais a partir de vendas_diarias, nos meses que tocam [inicio, fim) (ou em todos)"""
+    filtro, params = '', []
+    if inicio is None:
+        cursor.execute("DELETE FROM vendas_mensais")
+    else:
+        de, ate = inicio.replace(day=1), _mes_seguinte(fim - timedelta(days=1))
+        cursor.execute("DELETE FROM vendas_mensais WHERE mes >= %s AND mes < %s", (de, ate))
+        filtro, params = " WHERE dia >= %s AND dia < %s", [de, ate]
+    cursor.execute(f"""
+        INSERT INTO vendas_mensais (mes, categoria, pedidos, receita, itens, cancelamentos)
+        SELECT DATE_FORMAT(dia, '%Y-%m-01'), categoria, SUM(pedidos), SUM(receita), SUM(itens), SUM(cancelamentos)
+        FROM vendas_diarias{filtro}
+        GROUP BY DATE_FORMAT(dia, '%Y-%m-01'), categoria
+    """, params)
+
+
+def reconstruir_vendas_diarias(inicio=None, fim=None, dias_por_lote=31):
+    """Recalcula vendas_diarias (e os meses de vendas_mensais) a partir do histórico, um lote de dias por transação.
+
+    Sem datas, cobre do primeiro pedido até hoje. Gera (inicio, fim) de cada lote concluído.
+    """
+    if dias_por_lote < 1:
+        raise ValueError("dias_por_lote deve ser pelo menos 1")
+    if inicio is None:
+        with cursor_db() as cursor:
+            cursor.execute("SELECT DATE(MIN(data_pedido)) FROM pedidos")
+            inicio = cursor.fetchone()[0]
+        if inicio is None:
+            return
+    fim = fim or date.today() + timedelta(days=1)
+    while inicio < fim:
+        limite = min(inicio + timedelta(days=dias_por_lote), fim)
+        with cursor_db(commit=True) as cursor:
+            _recalcular_dias(cursor, inicio, limite)
+            _recalcular_vendas_mensais(cursor, inicio, limite)
+        yield inicio, limite
+        inicio = limite
+
+
+def atualizar_relatorios(completo=False):
+    """Recalcula os resumos afetados pelos pedidos alterados desde a última execução"""
+    with cursor_db(commit=True) as cursor:
+        # Trava a linha de controle: duas execuções simultâneas não processam a mesma janela
+        cursor.execute("""
+            INSERT IGNORE INTO relatorio_controle (nome, atualizado_ate) VALUES (%s, NULL)
+        """, (CHAVE_CONTROLE,))
+        cursor.execute("SELECT atualizado_ate FROM relatorio_controle WHERE nome = %s FOR UPDATE", (CHAVE_CONTROLE,))
+        desde = cursor.fetchone()[0]
+        cursor.execute("SELECT NOW()")
+        agora = cursor.fetchone()[0]
+
+        if completo or desde is None:
+            _recalcular_meses(cursor)
+            _recalcular_produtos(cursor)
+            _recalcular_clientes(cursor)
+            alterados = 'completo'
+        else:
+            cursor.execute("""
+                SELECT id_pedido, id_cliente, YEAR(data_pedido), MONTH(data_pedido), DATE(data_pedido)
+                FROM pedidos
+                WHERE atualizado_em >= %s - INTERVAL %s SECOND
+            """, (desde, _MARGEM_SEGUNDOS))
+            pedidos = cursor.fetchall()
+            if not pedidos:
+                alterados = 0
+            else:
+                ids_pedido = [linha[0] for linha in pedidos]
+                clientes = sorted({linha[1] for linha in pedidos})
+                meses = sorted({(linha[2], linha[3]) for linha in pedidos if linha[2] is not None})
+                dias = sorted({linha[4] for linha in pedidos if linha[4] is not None})
+                cursor.execute(f"""
+                    SELECT DISTINCT id_produto FROM itens_pedido WHERE id_pedido IN ({_marcadores(ids_pedido)})
+                """, ids_pedido)
+                produtos = [linha[0] for linha in cursor.fetchall()]
+
+                if meses:
+                    _recalcular_meses(cursor, meses)
+                for dia in dias:
+                    _recalcular_dias(cursor, dia, dia + timedelta(days=1))
+                for ano, mes in meses:
+                    _recalcular_vendas_mensais(cursor, date(ano, mes, 1), _mes_seguinte(date(ano, mes, 1)))
+                if produtos:
+                    _recalcular_produtos(cursor, produtos)
+                _recalcular_clientes(cursor, clientes)
+                alterados = len(pedidos)
+
+        cursor.execute("UPDATE relatorio_controle SET atualizado_ate = %s WHERE nome = %s", (agora, CHAVE_CONTROLE))
+        # Base anterior à tabela vendas_diarias: o histórico diário ainda precisa ser gerado
+        cursor.execute("SELECT 1 FROM vendas_diarias LIMIT 1")
+        sem_historico_diario = cursor.fetchone() is None
+        if not sem_historico_diario:
+            # Base anterior a vendas_mensais: o resumo mensal sai inteiro do diário
+            cursor.execute("SELECT 1 FROM vendas_mensais LIMIT 1")
+            if cursor.fetchone() is None:
+                _recalcular_vendas_mensais(cursor)
+
+    if alterados == 'completo' or sem_historico_diario:
+        # Fora da transação acima: o histórico diário é refeito em lotes
+        for _ in reconstruir_vendas_diarias():
+            pass
+    return alterados
+
+
+def carregar_relatorios():
+    """Dados da página de relatórios, lidos só das tabelas de resumo (e do estoque atual)"""
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT ano, mes, total_pedidos, receita_total,
+                   COALESCE(receita_total / NULLIF(total_pedidos, 0), 0) AS ticket_medio,
+                   clientes_unicos, pedidos_cancelados
+            FROM relatorio_mensal
+            ORDER BY ano DESC, mes DESC
+            LIMIT 12
+        """)
+        relatorios_mensais = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT p.id_produto, p.nome, p.marca, p.categoria, r.total_vendido, r.receita_total
+            FROM relatorio_produtos r
+            JOIN produto p ON p.id_produto = r.id_produto
+            ORDER BY r.total_vendido DESC
+            LIMIT 10
+        """)
+        produtos_mais_vendidos = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT c.id_cliente, c.nome, c.email, r.total_pedidos, r.total_gasto, r.ultima_compra
+            FROM relatorio_clientes r
+            JOIN clientes c ON c.id_cliente = r.id_cliente
+            ORDER BY r.total_gasto DESC
+            LIMIT 10
+        """)
+        clientes_ativos = cursor.fetchall()
+
+        # Estoque crítico: só os poucos produtos com estoque baixo, com as vendas dos últimos 30 dias
+        cursor.execute("""
+            SELECT p.id_produto, p.nome, p.marca, p.categoria, p.estoque, p.preco,
+                   COALESCE(SUM(ip.quantidade), 0) AS vendas_mes
+            FROM produto p
+            LEFT JOIN (itens_pedido ip JOIN pedidos ped ON ped.id_pedido = ip.id_pedido
+                       AND ped.data_pedido >= CURRENT_DATE - INTERVAL 30 DAY
+                       AND ped.status != 'cancelado')
+                ON ip.id_produto = p.id_produto
+            WHERE p.ativo = TRUE AND p.estoque <= %s
+            GROUP BY p.id_produto
+            ORDER BY p.estoque ASC
+        """, (Config.RELATORIOS_ESTOQUE_CRITICO,))
+        estoque_critico = cursor.fetchall()
+
+    return {
+        'relatorios_mensais': relatorios_mensais,
+        'produtos_mais_vendidos': produtos_mais_vendidos,
+        'clientes_ativos': clientes_ativos,
+        'estoque_critico': estoque_critico,
+    }
+
+
+def _fonte_periodo(inicio, fim_exclusivo, filtro_categoria):
+    """Linhas do período: meses inteiros de vendas_mensais e as sobras nas pontas de vendas_diarias"""
+    mes_inicio = inicio if inicio.day == 1 else _mes_seguinte(inicio)
+    mes_fim = fim_exclusivo.replace(day=1)
+    if mes_inicio >= mes_fim:
+        # Nenhum mês inteiro: tudo vem do diário
+        mes_inicio = mes_fim = fim_exclusivo
+    sql = f"""
+        (SELECT categoria, dia AS data, pedidos, receita, itens, cancelamentos
+         FROM vendas_diarias
+         WHERE {filtro_categoria} AND dia >= %s AND dia < %s AND (dia < %s OR dia >= %s)
+         UNION ALL
+         SELECT categoria, mes AS data, pedidos, receita, itens, cancelamentos
+         FROM vendas_mensais
+         WHERE {filtro_categoria} AND mes >= %s AND mes < %s) v
+    """
+    params = [CATEGORIA_TOTAL, inicio, fim_exclusivo, mes_inicio, mes_fim,
+              CATEGORIA_TOTAL, mes_inicio, mes_fim]
+    return sql, params
+
+
+def relatorio_vendas_periodo(inicio, fim):
+    """Totais, vendas por categoria e série diária (ou mensal) de inicio a fim, inclusive"""
+    fim_exclusivo = fim + timedelta(days=1)
+    por_mes = (fim - inicio).days > Config.RELATORIOS_SERIE_DIARIA_MAX_DIAS
+    total, params_total = _fonte_periodo(inicio, fim_exclusivo, 'categoria = %s')
+    por_categoria, params_categoria = _fonte_periodo(inicio, fim_exclusivo, 'categoria != %s')
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(pedidos), 0) AS pedidos, COALESCE(SUM(receita), 0) AS receita,
+                   COALESCE(SUM(itens), 0) AS itens, COALESCE(SUM(cancelamentos), 0) AS cancelamentos
+            FROM {total}
+        """, params_total)
+        totais = cursor.fetchone()
+        totais['ticket_medio'] = totais['receita'] / totais['pedidos'] if totais['pedidos'] else 0
+
+        cursor.execute(f"""
+            SELECT categoria, SUM(pedidos) AS pedidos, SUM(receita) AS receita,
+                   SUM(itens) AS itens, SUM(cancelamentos) AS cancelamentos
+            FROM {por_categoria}
+            GROUP BY categoria
+            ORDER BY receita DESC
+        """, params_categoria)
+        categorias = cursor.fetchall()
+
+        if por_mes:
+            cursor.execute(f"""
+                SELECT DATE_FORMAT(data, '%Y-%m-01') AS periodo, SUM(pedidos) AS pedidos, SUM(receita) AS receita,
+                       SUM(itens) AS itens, SUM(cancelamentos) AS cancelamentos
+                FROM {total}
+                GROUP BY periodo
+                ORDER BY periodo
+            """, params_total)
+        else:
+            # Série diária: no máximo RELATORIOS_SERIE_DIARIA_MAX_DIAS linhas do diário
+            cursor.execute("""
+                SELECT dia AS periodo, pedidos, receita, itens, cancelamentos
+                FROM vendas_diarias
+                WHERE categoria = %s AND dia >= %s AND dia < %s
+                ORDER BY dia
+            """, (CATEGORIA_TOTAL, inicio, fim_exclusivo))
+        serie = cursor.fetchall()
+
+    return {'totais': totais, 'categorias': categorias, 'serie': serie, 'serie_mensal': por_mes}
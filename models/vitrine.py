@@ -0,0 +1,89 @@
+"""
+Vitrine da página inicial (produtos em destaque + ofertas) montada uma vez e
+servida da memória. Invalidada pelas rotas de ofertas/produtos do admin e
+expirada à meia-noite, quando ofertas com validade vencida deixam de valer.
+"""
+
+from datetime import datetime, timedelta
+
+from config import Config
+from models.database import cursor_db
+from models.produto import mapear_produtos
+from utils.cache import CacheTTL
+
+_cache_vitrine = CacheTTL(ttl=Config.VITRINE_CACHE_TTL, max_itens=4)
+
+
+def _segundos_ate_meia_noite():
+    agora = datetime.now()
+    meia_noite = datetime.combine(agora.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((meia_noite - agora).total_seconds()))
+
+
+def _montar_produtos_destaque():
+    with cursor_db(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT p.*
+            FROM produto p
+            WHERE p.ativo = TRUE
+            ORDER BY p.destaque DESC, p.data_cadastro DESC
+            LIMIT 8
+        """)
+        produtos_base = mapear_produtos(cursor.fetchall(), cursor)
+
+        cursor.execute("""
+            SELECT o.*, p.nome, p.descricao, p.categoria, p.marca, p.imagens
+            FROM ofertas o
+            JOIN produto p ON o.id_produto = p.id_produto
+            WHERE o.ativa = TRUE
+            AND (o.validade IS NULL OR o.validade >= CURDATE())
+            AND p.ativo = TRUE
+            ORDER BY o.desconto DESC
+            LIMIT 6
+        """)
+        ofertas = mapear_produtos(cursor.fetchall(), cursor)
+
+    produtos_destaque = []
+
+    for oferta in ofertas:
+        produtos_destaque.append({
+            'id_produto': oferta['id_produto'],
+            'nome': oferta['nome'],
+            'descricao': oferta['descricao'],
+            'categoria': oferta['categoria'],
+            'marca': oferta['marca'],
+            'preco': oferta['preco_original'],
+            'preco_com_desconto': oferta['preco_com_desconto'],
+            'desconto': oferta['desconto'],
+            'tem_oferta': True,
+            'imagens': oferta['imagens']
+        })
+
+    produtos_base_ids = [p['id_produto'] for p in produtos_destaque]
+    for produto in produtos_base:
+        if produto['id_produto'] not in produtos_base_ids and len(produtos_destaque) < 8:
+            produtos_destaque.append({
+                'id_produto': produto['id_produto'],
+                'nome': produto['nome'],
+                'descricao': produto['descricao'],
+                'categoria': produto['categoria'],
+                'marca': produto['marca'],
+                'preco': produto['preco'],
+                'preco_com_desconto': produto['preco'],
+                'desconto': 0,
+                'tem_oferta': False,
+                'imagens': produto['imagens']
+            })
+
+    return produtos_destaque
+
+
+def obter_produtos_destaque():
+    """Lista pronta da vitrine; consulta o banco só quando o cache expira ou é invalidado"""
+    ttl = min(Config.VITRINE_CACHE_TTL, _segundos_ate_meia_noite())
+    return _cache_vitrine.obter_ou_calcular('destaques', _montar_produtos_destaque, ttl=ttl)
+
+
+def invalidar_vitrine():
+    """Descarta a vitrine em cache (chamado após gravar ofertas ou produtos)"""
+    _cache_vitrine.invalidar()
@@ -1,19 +1,89 @@
 from flask import render_template, request, redirect, url_for, session, flash, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
-from models.database import get_db_connection
+from models.database import get_db_connection, obter_metricas_pool, cursor_db
+from models.catalogo import invalidar_catalogo
+from models.vitrine import invalidar_vitrine
+from models.carrinho import invalidar_produtos_carrinho
+from models.produto import decodificar_imagens, mapear_produto, salvar_imagens_produto, liberar_imagens
+from models.avaliacoes import contar_avaliacoes_pendentes, listar_avaliacoes_pendentes, moderar_avaliacoes
+from models.painel import obter_metricas_dashboard
+from models.relatorios import carregar_relatorios, relatorio_vendas_periodo
+from utils.imagens import salvar_imagem_upload
+from utils.paginacao import Listagem, codificar_cursor, decodificar_cursor, invalidar_contagens
+from utils.exportacao import exportar_csv
 from utils.decorators import admin_required, permission_required, PERMISSIONS
 import mysql.connector
 import json
-import os
-from werkzeug.utils import secure_filename
+from datetime import date, timedelta
 from config import Config
 
+LISTAGEM_PRODUTOS = Listagem(
+    'produto',
+    'id_produto, nome, marca, categoria, preco, estoque, imagem, destaque, ativo, data_cadastro',
+    'id_produto',
+    {'data': 'data_cadastro', 'nome': 'nome', 'preco': 'preco', 'estoque': 'estoque'},
+    'data')
+
+LISTAGEM_CLIENTES = Listagem(
+    'clientes',
+    'id_cliente, nome, email, telefone, cpf, genero, ativo, data_cadastro',
+    'id_cliente',
+    {'data': 'data_cadastro', 'nome': 'nome', 'email': 'email', 'cpf': 'cpf'},
+    'data')
+
+LISTAGEM_CONCORRENTES = Listagem(
+    'concorrentes',
+    """id_concorrente, nome, empresa, cargo, email, telefone, interesse, status, data_cadastro,
+       LEFT(observacoes, 50) AS observacoes""",
+    'id_concorrente',
+    {'data': 'data_cadastro', 'nome': 'nome', 'empresa': 'empresa'},
+    'data')
+
+LISTAGEM_DIAGNOSTICOS = Listagem(
+    'diagnosticos d',
+    """d.id_diagnostico, d.status, d.orcamento, d.data_entrada, d.data_conclusao,
+       d.tecnico_responsavel, f.nome AS tecnico_nome""",
+    'd.id_diagnostico',
+    {'data': 'd.data_entrada'},
+    'data',
+    juncoes='LEFT JOIN funcionarios f ON d.tecnico_responsavel = f.id_funcionario')
+
+def _filtro_produtos(args):
+    """Filtros da listagem de produtos, compartilhados entre a tela e a exportação"""
+    where, params = "1=1", []
+    if args.get('categoria'):
+        where += " AND categoria = %s"
+        params.append(args['categoria'])
+    if args.get('busca'):
+        where += " AND (nome LIKE %s OR marca LIKE %s)"
+        params.extend([f"%{args['busca']}%"] * 2)
+    return where, params
+
+def _filtro_clientes(args):
+    """Filtros da listagem de clientes, compartilhados entre a tela e a exportação"""
+    where, params = "1=1", []
+    if args.get('busca'):
+        where += " AND (nome LIKE %s OR email LIKE %s OR cpf LIKE %s)"
+        params.extend([f"%{args['busca']}%"] * 3)
+    return where, params
+
+def _filtro_diagnosticos(args):
+    """Filtros da listagem de diagnósticos, compartilhados entre a tela e a exportação"""
+    where, params = "1=1", []
+    if args.get('status'):
+        where += " AND d.status = %s"
+        params.append(args['status'])
+    return where, params
+
+def _exportar(query, params, cabecalho, nome_arquivo, voltar):
+    try:
+        return exportar_csv(query, params, cabecalho, nome_arquivo)
+    except mysql.connector.Error as err:
+        flash(f'Erro ao exportar: {err}', 'error')
+        return redirect(url_for(voltar, **request.args))
+
 def configure_admin_routes(app):
     
-    # Função auxiliar para verificar arquivos permitidos
-    def allowed_file(filename):
-        return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
-
     # Context processor para injetar user_cargo em todos os templates
     @app.context_processor
     def inject_user_cargo():
@@ -65,112 +135,26 @@ def configure_admin_routes(app):
     @admin_required
     def admin_dashboard():
         user_cargo = session.get('admin_cargo', '').lower()
-        
-        total_clientes = 0
-        total_produtos = 0
-        pedidos_hoje = 0
-        receita_hoje = 0
-        diagnosticos_pendentes = 0
-        estoque_baixo = []
-        pedidos_recentes = []
-        diagnosticos_recentes = []
-        
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('admin/dashboard.html', 
-                                     total_clientes=total_clientes,
-                                     total_produtos=total_produtos,
-                                     pedidos_hoje=pedidos_hoje,
-                                     receita_hoje=receita_hoje,
-                                     diagnosticos_pendentes=diagnosticos_pendentes,
-                                     estoque_baixo=estoque_baixo,
-                                     pedidos_recentes=pedidos_recentes,
-                                     diagnosticos_recentes=diagnosticos_recentes,
-                                     user_cargo=user_cargo)
-            
-            cursor = conn.cursor(dictionary=True)
-            
-            # Consulta para total de produtos (todos os cargos podem ver)
-            cursor.execute("SELECT COUNT(*) as total FROM produto WHERE ativo = TRUE")
-            total_produtos = cursor.fetchone()['total']
-            
-            # Consulta para total de clientes (admin, gerente, vendedor)
-            if user_cargo in ['admin', 'gerente', 'vendedor']:
-                cursor.execute("SELECT COUNT(*) as total FROM clientes WHERE ativo = TRUE")
-                total_clientes = cursor.fetchone()['total']
-            
-            # Consulta para pedidos de hoje (admin, gerente, vendedor)
-            if user_cargo in ['admin', 'gerente', 'vendedor']:
-                cursor.execute("SELECT COUNT(*) as total FROM pedidos WHERE DATE(data_pedido) = CURDATE()")
-                pedidos_hoje = cursor.fetchone()['total']
-            
-            # Consulta para receita de hoje (admin, gerente, vendedor)
-            if user_cargo in ['admin', 'gerente', 'vendedor']:
-                cursor.execute("SELECT SUM(total) as total FROM pedidos WHERE DATE(data_pedido) = CURDATE() AND status != 'cancelado'")
-                receita_result = cursor.fetchone()
-                receita_hoje = receita_result['total'] or 0
-            
-            # Consulta para diagnósticos pendentes (admin, gerente, suporte)
-            if user_cargo in ['admin', 'gerente', 'suporte']:
-                try:
-                    cursor.execute("SELECT COUNT(*) as total FROM diagnosticos WHERE status = 'recebido' OR status = 'em_analise'")
-                    diagnosticos_pendentes = cursor.fetchone()['total']
-                except mysql.connector.Error:
-                    diagnosticos_pendentes = 0
-            
-            # Consulta para estoque baixo (admin, gerente, vendedor)
-            if user_cargo in ['admin', 'gerente', 'vendedor']:
-                try:
-                    cursor.execute("SELECT * FROM produto WHERE estoque <= 5 AND ativo = TRUE ORDER BY estoque ASC LIMIT 5")
-                    estoque_baixo = cursor.fetchall()
-                except mysql.connector.Error:
-                    estoque_baixo = []
-            
-            # Consulta para pedidos recentes (admin, gerente, vendedor)
-            if user_cargo in ['admin', 'gerente', 'vendedor']:
-                try:
-                    cursor.execute("SELECT p.*, c.nome as cliente_nome FROM pedidos p JOIN clientes c ON p.id_cliente = c.id_cliente ORDER BY p.data_pedido DESC LIMIT 5")
-                    pedidos_recentes = cursor.fetchall()
-                except mysql.connector.Error:
-                    pedidos_recentes = []
-            
-            # Consulta para diagnósticos recentes (admin, gerente, suporte)
-            if user_cargo in ['admin', 'gerente', 'suporte']:
-                try:
-                    cursor.execute("SELECT * FROM diagnosticos ORDER BY data_entrada DESC LIMIT 5")
-                    diagnosticos_recentes = cursor.fetchall()
-                except mysql.connector.Error:
-                    diagnosticos_recentes = []
-            
-            return render_template('admin/dashboard.html', 
-                                 total_clientes=total_clientes,
-                                 total_produtos=total_produtos,
-                                 pedidos_hoje=pedidos_hoje,
-                                 receita_hoje=receita_hoje,
-                                 diagnosticos_pendentes=diagnosticos_pendentes,
-                                 estoque_baixo=estoque_baixo,
-                                 pedidos_recentes=pedidos_recentes,
-                                 diagnosticos_recentes=diagnosticos_recentes,
-                                 user_cargo=user_cargo)
-                                 
+            metricas = obter_metricas_dashboard(user_cargo)
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar dashboard: {err}', 'error')
-            return render_template('admin/dashboard.html', 
-                                 total_clientes=total_clientes,
-                                 total_produtos=total_produtos,
-                                 pedidos_hoje=pedidos_hoje,
-                                 receita_hoje=receita_hoje,
-                                 diagnosticos_pendentes=diagnosticos_pendentes,
-                                 estoque_baixo=estoque_baixo,
-                                 pedidos_recentes=pedidos_recentes,
-                                 diagnosticos_recentes=diagnosticos_recentes,
-                                 user_cargo=user_cargo)
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+            metricas = {
+                'total_clientes': 0,
+                'total_produtos': 0,
+                'pedidos_hoje': 0,
+                'receita_hoje': 0,
+                'diagnosticos_pendentes': 0,
+                'estoque_baixo': [],
+                'pedidos_recentes': [],
+                'diagnosticos_recentes': [],
+            }
+        return render_template('admin/dashboard.html', user_cargo=user_cargo, **metricas)
+
+    @app.route('/admin/pool-metricas')
+    @permission_required(['admin'])
+    def admin_pool_metricas():
+        return jsonify(obter_metricas_pool())
 
     # PRODUTOS - Admin, Gerente e Vendedor (apenas visualização)
     @app.route('/admin/produtos')
@@ -183,22 +167,12 @@ def configure_admin_routes(app):
                 flash('Erro ao conectar ao banco de dados.', 'error')
                 return render_template('admin/produtos.html', produtos=[], user_cargo=user_cargo)
             cursor = conn.cursor(dictionary=True)
-            categoria = request.args.get('categoria')
-            busca = request.args.get('busca')
-            query = "SELECT * FROM produto WHERE 1=1"
-            params = []
-            if categoria:
-                query += " AND categoria = %s"
-                params.append(categoria)
-            if busca:
-                query += " AND (nome LIKE %s OR marca LIKE %s)"
-                params.extend([f"%{busca}%", f"%{busca}%"])
-            query += " ORDER BY data_cadastro DESC"
-            cursor.execute(query, params)
-            produtos = cursor.fetchall()
+            where, params = _filtro_produtos(request.args)
+            produtos, paginacao = LISTAGEM_PRODUTOS.paginar(cursor, where, params, request.args, 'admin_produtos')
             cursor.execute("SELECT DISTINCT categoria FROM produto ORDER BY categoria")
             categorias = [row['categoria'] for row in cursor.fetchall()]
-            return render_template('admin/produtos.html', produtos=produtos, categorias=categorias, user_cargo=user_cargo)
+            return render_template('admin/produtos.html', produtos=produtos, categorias=categorias,
+                                   paginacao=paginacao, user_cargo=user_cargo)
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar produtos: {err}', 'error')
             return render_template('admin/produtos.html', produtos=[], user_cargo=user_cargo)
@@ -207,6 +181,17 @@ def configure_admin_routes(app):
                 cursor.close()
                 conn.close()
 
+    @app.route('/admin/produtos/exportar.csv')
+    @permission_required(['admin', 'gerente', 'vendedor'])
+    def admin_exportar_produtos():
+        where, params = _filtro_produtos(request.args)
+        return _exportar(
+            f"""SELECT id_produto, nome, marca, categoria, preco, estoque, ativo, data_cadastro
+                FROM produto WHERE {where} ORDER BY data_cadastro DESC""",
+            params,
+            ['ID', 'Nome', 'Marca', 'Categoria', 'Preço', 'Estoque', 'Ativo', 'Data Cadastro'],
+            'produtos', 'admin_produtos')
+
     @app.route('/admin/produto/novo', methods=['GET', 'POST'])
     @permission_required(['admin', 'gerente'])
     def admin_novo_produto():
@@ -237,22 +222,25 @@ def configure_admin_routes(app):
                 if 'imagens' in request.files:
                     files = request.files.getlist('imagens')
                     for file in files:
-                        if file and allowed_file(file.filename):
-                            filename = secure_filename(file.filename)
-                            from uuid import uuid4
-                            unique_filename = f"{uuid4().hex}_{filename}"
-                            filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-                            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                            file.save(filepath)
-                            imagens.append(unique_filename)
+                        if file and file.filename:
+                            nome_imagem = salvar_imagem_upload(file)
+                            if nome_imagem:
+                                imagens.append(nome_imagem)
+                            else:
+                                flash(f'⚠️ Arquivo ignorado (não é PNG, JPG, GIF ou WEBP): {file.filename}', 'warning')
                 
                 cursor.execute("""
                     INSERT INTO produto (nome, marca, preco, descricao, estoque, categoria, imagens, peso, dimensoes, destaque)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (nome, marca, float(preco), descricao, int(estoque), categoria, json.dumps(imagens) if imagens else None,
                       float(peso) if peso else 0, dimensoes, destaque))
+                salvar_imagens_produto(cursor, cursor.lastrowid, imagens)
                 
                 conn.commit()
+                invalidar_catalogo()
+                invalidar_vitrine()
+                invalidar_produtos_carrinho()
+                invalidar_contagens('produto')
                 
                 if session.get('admin_id'):
                     try:
@@ -288,16 +276,10 @@ def configure_admin_routes(app):
                 flash('Erro ao conectar ao banco de dados.', 'error')
                 return render_template('admin/clientes.html', clientes=[], user_cargo=user_cargo)
             cursor = conn.cursor(dictionary=True)
-            busca = request.args.get('busca')
-            query = "SELECT * FROM clientes WHERE 1=1"
-            params = []
-            if busca:
-                query += " AND (nome LIKE %s OR email LIKE %s OR cpf LIKE %s)"
-                params.extend([f"%{busca}%", f"%{busca}%", f"%{busca}%"])
-            query += " ORDER BY data_cadastro DESC"
-            cursor.execute(query, params)
-            clientes = cursor.fetchall()
-            return render_template('admin/clientes.html', clientes=clientes, user_cargo=user_cargo)
+            where, params = _filtro_clientes(request.args)
+            clientes, paginacao = LISTAGEM_CLIENTES.paginar(cursor, where, params, request.args, 'admin_clientes')
+            return render_template('admin/clientes.html', clientes=clientes, paginacao=paginacao,
+                                   user_cargo=user_cargo)
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar clientes: {err}', 'error')
             return render_template('admin/clientes.html', clientes=[], user_cargo=user_cargo)
@@ -306,6 +288,17 @@ def configure_admin_routes(app):
                 cursor.close()
                 conn.close()
 
+    @app.route('/admin/clientes/exportar.csv')
+    @permission_required(['admin', 'gerente', 'vendedor'])
+    def admin_exportar_clientes():
+        where, params = _filtro_clientes(request.args)
+        return _exportar(
+            f"""SELECT id_cliente, nome, email, cpf, telefone, data_nascimento, genero, ativo, data_cadastro
+                FROM clientes WHERE {where} ORDER BY data_cadastro DESC""",
+            params,
+            ['ID', 'Nome', 'E-mail', 'CPF', 'Telefone', 'Data Nascimento', 'Gênero', 'Ativo', 'Data Cadastro'],
+            'clientes', 'admin_clientes')
+
     # FUNCIONÁRIOS - Apenas Admin
     @app.route('/admin/funcionarios')
     @permission_required(['admin'])
@@ -327,6 +320,16 @@ def configure_admin_routes(app):
                 cursor.close()
                 conn.close()
 
+    @app.route('/admin/funcionarios/exportar.csv')
+    @permission_required(['admin'])
+    def admin_exportar_funcionarios():
+        return _exportar(
+            """SELECT id_funcionario, nome, email, cargo, ativo, data_cadastro, ultimo_login
+               FROM funcionarios ORDER BY data_cadastro DESC""",
+            (),
+            ['ID', 'Nome', 'E-mail', 'Cargo', 'Ativo', 'Data Cadastro', 'Último Login'],
+            'funcionarios', 'admin_funcionarios')
+
     # OFERTAS - Admin e Gerente
     @app.route('/admin/ofertas')
     @permission_required(['admin', 'gerente'])
@@ -361,13 +364,13 @@ def configure_admin_routes(app):
             
             cursor = conn.cursor(dictionary=True)
             
-            cursor.execute("""
-                SELECT * FROM concorrentes 
-                ORDER BY data_cadastro DESC
-            """)
-            concorrentes = cursor.fetchall()
+            concorrentes, paginacao = LISTAGEM_CONCORRENTES.paginar(cursor, "1=1", [], request.args,
+                                                                   'admin_concorrentes')
+            por_status = {status: LISTAGEM_CONCORRENTES.contar(cursor, "status = %s", [status])
+                          for status in ('pendente', 'contatado')}
             
-            return render_template('admin/concorrentes.html', concorrentes=concorrentes)
+            return render_template('admin/concorrentes.html', concorrentes=concorrentes,
+                                   paginacao=paginacao, por_status=por_status)
             
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar concorrentes: {err}', 'error')
@@ -383,6 +386,49 @@ def configure_admin_routes(app):
     def documentation():
         return render_template('admin/documentation.html')
     
+    # MODERAÇÃO DE AVALIAÇÕES - Admin e Gerente
+    @app.route('/admin/avaliacoes')
+    @permission_required(['admin', 'gerente'])
+    def admin_avaliacoes():
+        user_cargo = session.get('admin_cargo', '').lower()
+        try:
+            avaliacoes, proxima = listar_avaliacoes_pendentes(Config.AVALIACOES_MODERACAO_POR_PAGINA,
+                                                              decodificar_cursor(request.args.get('cursor')))
+            total_pendentes = contar_avaliacoes_pendentes()
+        except mysql.connector.Error as err:
+            flash(f'Erro ao carregar avaliações: {err}', 'error')
+            avaliacoes, proxima, total_pendentes = [], None, 0
+        url_proxima = url_for('admin_avaliacoes', cursor=codificar_cursor(proxima)) if proxima else None
+        return render_template('admin/avaliacoes.html', avaliacoes=avaliacoes, total_pendentes=total_pendentes,
+                               url_proxima=url_proxima, user_cargo=user_cargo)
+
+    @app.route('/admin/avaliacoes/moderar', methods=['POST'])
+    @permission_required(['admin', 'gerente'])
+    def admin_moderar_avaliacoes():
+        acao = request.form.get('acao')
+        ids = [int(id_avaliacao) for id_avaliacao in request.form.getlist('avaliacoes') if id_avaliacao.isdigit()]
+        if acao not in ('aprovar', 'rejeitar') or not ids:
+            flash('⚠️ Selecione ao menos uma avaliação.', 'warning')
+            return redirect(url_for('admin_avaliacoes'))
+        try:
+            alteradas = moderar_avaliacoes(ids, aprovar=acao == 'aprovar')
+            if session.get('admin_id'):
+                try:
+                    with cursor_db(commit=True) as cursor:
+                        cursor.execute("""
+                            INSERT INTO logs_sistema (id_funcionario, acao, modulo, descricao)
+                            VALUES (%s, 'MODERACAO', 'AVALIACOES', %s)
+                        """, (session['admin_id'], f'{alteradas} avaliação(ões) - {acao}'))
+                except mysql.connector.Error:
+                    pass
+            if acao == 'aprovar':
+                flash(f'✅ {alteradas} avaliação(ões) aprovada(s)!', 'success')
+            else:
+                flash(f'🗑️ {alteradas} avaliação(ões) rejeitada(s).', 'success')
+        except mysql.connector.Error as err:
+            flash(f'Erro ao moderar avaliações: {err}', 'error')
+        return redirect(url_for('admin_avaliacoes'))
+
     # CONTATOS - Admin e Gerente
     @app.route('/admin/contatos')
     @permission_required(['admin', 'gerente'])
@@ -412,6 +458,16 @@ def configure_admin_routes(app):
                 cursor.close()
                 conn.close()
 
+    @app.route('/admin/contatos/exportar.csv')
+    @permission_required(['admin', 'gerente'])
+    def admin_exportar_contatos():
+        return _exportar(
+            """SELECT id_suporte, nome, email, mensagem, status, observacoes, data_envio
+               FROM suporte ORDER BY data_envio DESC""",
+            (),
+            ['ID', 'Nome', 'E-mail', 'Mensagem', 'Status', 'Observações', 'Data Envio'],
+            'contatos', 'admin_contatos')
+
     # DIAGNÓSTICOS - Admin, Gerente e Suporte
     @app.route('/admin/diagnosticos')
     @permission_required(['admin', 'gerente', 'suporte'])
@@ -423,16 +479,11 @@ def configure_admin_routes(app):
                 flash('Erro ao conectar ao banco de dados.', 'error')
                 return render_template('admin/diagnosticos.html', diagnosticos=[], user_cargo=user_cargo)
             cursor = conn.cursor(dictionary=True)
-            status = request.args.get('status')
-            query = "SELECT d.*, f.nome as tecnico_nome FROM diagnosticos d LEFT JOIN funcionarios f ON d.tecnico_responsavel = f.id_funcionario WHERE 1=1"
-            params = []
-            if status:
-                query += " AND d.status = %s"
-                params.append(status)
-            query += " ORDER BY d.data_entrada DESC"
-            cursor.execute(query, params)
-            diagnosticos = cursor.fetchall()
-            return render_template('admin/diagnosticos.html', diagnosticos=diagnosticos, user_cargo=user_cargo)
+            where, params = _filtro_diagnosticos(request.args)
+            diagnosticos, paginacao = LISTAGEM_DIAGNOSTICOS.paginar(cursor, where, params, request.args,
+                                                                   'admin_diagnosticos')
+            return render_template('admin/diagnosticos.html', diagnosticos=diagnosticos, paginacao=paginacao,
+                                   user_cargo=user_cargo)
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar diagnósticos: {err}', 'error')
             return render_template('admin/diagnosticos.html', diagnosticos=[], user_cargo=user_cargo)
@@ -441,59 +492,55 @@ def configure_admin_routes(app):
                 cursor.close()
                 conn.close()
 
+    @app.route('/admin/diagnosticos/exportar.csv')
+    @permission_required(['admin', 'gerente', 'suporte'])
+    def admin_exportar_diagnosticos():
+        where, params = _filtro_diagnosticos(request.args)
+        return _exportar(
+            f"""SELECT d.id_diagnostico, d.status, d.orcamento, d.pecas_defeito, d.relatorio_final,
+                       d.observacoes, f.nome AS tecnico_nome, d.data_entrada, d.data_conclusao
+                FROM diagnosticos d
+                LEFT JOIN funcionarios f ON d.tecnico_responsavel = f.id_funcionario
+                WHERE {where} ORDER BY d.data_entrada DESC""",
+            params,
+            ['ID', 'Status', 'Orçamento', 'Peças com Defeito', 'Relatório Final', 'Observações',
+             'Técnico', 'Data Entrada', 'Data Conclusão'],
+            'diagnosticos', 'admin_diagnosticos')
+
     # RELATÓRIOS - Admin, Gerente e Vendedor (apenas visualização)
     @app.route('/admin/relatorios')
     @permission_required(['admin', 'gerente', 'vendedor'])
     def admin_relatorios():
         user_cargo = session.get('admin_cargo', '').lower()
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('admin/relatorios.html', user_cargo=user_cargo)
-            cursor = conn.cursor(dictionary=True)
-            
-            # Tentar buscar relatórios mensais
-            try:
-                cursor.execute("SELECT * FROM view_relatorios_mensais LIMIT 12")
-                relatorios_mensais = cursor.fetchall()
-            except mysql.connector.Error:
-                relatorios_mensais = []
-            
-            # Tentar buscar produtos mais vendidos
-            try:
-                cursor.execute("SELECT * FROM view_produtos_mais_vendidos LIMIT 10")
-                produtos_mais_vendidos = cursor.fetchall()
-            except mysql.connector.Error:
-                produtos_mais_vendidos = []
-            
-            # Tentar buscar clientes ativos
-            try:
-                cursor.execute("SELECT * FROM view_clientes_ativos LIMIT 10")
-                clientes_ativos = cursor.fetchall()
-            except mysql.connector.Error:
-                clientes_ativos = []
-            
-            # Tentar buscar estoque crítico
-            try:
-                cursor.execute("SELECT * FROM view_estoque_critico")
-                estoque_critico = cursor.fetchall()
-            except mysql.connector.Error:
-                estoque_critico = []
-            
-            return render_template('admin/relatorios.html', 
-                                 relatorios_mensais=relatorios_mensais,
-                                 produtos_mais_vendidos=produtos_mais_vendidos, 
-                                 clientes_ativos=clientes_ativos, 
-                                 estoque_critico=estoque_critico,
-                                 user_cargo=user_cargo)
+            relatorios = carregar_relatorios()
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar relatórios: {err}', 'error')
             return render_template('admin/relatorios.html', user_cargo=user_cargo)
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
+        return render_template('admin/relatorios.html', user_cargo=user_cargo, **relatorios)
+
+    @app.route('/admin/relatorios/vendas')
+    @permission_required(['admin', 'gerente', 'vendedor'])
+    def admin_relatorio_vendas():
+        """Vendas de um período qualquer, somadas dos resumos mensal e diário (vendas_mensais/vendas_diarias)"""
+        user_cargo = session.get('admin_cargo', '').lower()
+        hoje = date.today()
+        try:
+            inicio = date.fromisoformat(request.args.get('inicio') or (hoje - timedelta(days=29)).isoformat())
+            fim = date.fromisoformat(request.args.get('fim') or hoje.isoformat())
+        except ValueError:
+            flash('❌ Datas inválidas. Use o formato AAAA-MM-DD.', 'error')
+            return redirect(url_for('admin_relatorio_vendas'))
+        if inicio > fim:
+            inicio, fim = fim, inicio
+        
+        try:
+            relatorio = relatorio_vendas_periodo(inicio, fim)
+        except mysql.connector.Error as err:
+            flash(f'Erro ao carregar relatório de vendas: {err}', 'error')
+            relatorio = {}
+        return render_template('admin/relatorio_vendas.html', inicio=inicio, fim=fim,
+                               user_cargo=user_cargo, **relatorio)
 
     # COMBOS - Admin e Gerente
     @app.route('/admin/combos')
@@ -558,44 +605,43 @@ def configure_admin_routes(app):
     @app.route('/admin/ofertas/nova', methods=['GET', 'POST'])
     @permission_required(['admin', 'gerente'])
     def admin_nova_oferta():
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        try:
+            if request.method == 'POST':
+                id_produto = request.form.get('id_produto')
+                desconto = float(request.form.get('desconto', 0))
+                validade = request.form.get('validade')
 
-        # Buscar produtos ativos
-        cursor.execute("SELECT id_produto, nome, preco FROM produto WHERE ativo = TRUE ORDER BY nome ASC")
-        produtos = cursor.fetchall()
+                with cursor_db(dictionary=True, commit=True) as cursor:
+                    # Buscar preço original do produto
+                    cursor.execute("SELECT preco FROM produto WHERE id_produto = %s", (id_produto,))
+                    produto = cursor.fetchone()
+                    if not produto:
+                        flash('Produto não encontrado.', 'error')
+                        return redirect(url_for('admin_nova_oferta'))
 
-        if request.method == 'POST':
-            id_produto = request.form.get('id_produto')
-            desconto = float(request.form.get('desconto', 0))
-            validade = request.form.get('validade')
+                    preco_original = float(produto['preco'])
+                    preco_com_desconto = preco_original - (preco_original * (desconto / 100))
 
-            # Buscar preço original do produto
-            cursor.execute("SELECT preco FROM produto WHERE id_produto = %s", (id_produto,))
-            produto = cursor.fetchone()
-            if not produto:
-                flash('Produto não encontrado.', 'error')
-                return redirect(url_for('admin_nova_oferta'))
+                    # Inserir oferta
+                    cursor.execute("""
+                        INSERT INTO ofertas (id_produto, desconto, preco_original, preco_com_desconto, validade, ativa)
+                        VALUES (%s, %s, %s, %s, %s, TRUE)
+                    """, (id_produto, desconto, preco_original, preco_com_desconto, validade))
 
-            preco_original = float(produto['preco'])
-            preco_com_desconto = preco_original - (preco_original * (desconto / 100))
+                invalidar_vitrine()
+                flash('🎉 Oferta criada com sucesso!', 'success')
+                return redirect(url_for('admin_ofertas'))
 
-            # Inserir oferta
-            cursor.execute("""
-                INSERT INTO ofertas (id_produto, desconto, preco_original, preco_com_desconto, validade, ativa)
-                VALUES (%s, %s, %s, %s, %s, TRUE)
-            """, (id_produto, desconto, preco_original, preco_com_desconto, validade))
-            conn.commit()
+            # Buscar produtos ativos
+            with cursor_db(dictionary=True) as cursor:
+                cursor.execute("SELECT id_produto, nome, preco FROM produto WHERE ativo = TRUE ORDER BY nome ASC")
+                produtos = cursor.fetchall()
+            return render_template('admin/nova_oferta.html', produtos=produtos)
 
-            cursor.close()
-            conn.close()
-            flash('🎉 Oferta criada com sucesso!', 'success')
+        except mysql.connector.Error as err:
+            flash(f'Erro ao criar oferta: {err}', 'error')
             return redirect(url_for('admin_ofertas'))
 
-        cursor.close()
-        conn.close()
-        return render_template('admin/nova_oferta.html', produtos=produtos)
-
     @app.route('/admin/oferta/editar/<int:id_oferta>', methods=['GET', 'POST'])
     @permission_required(['admin', 'gerente'])
     def admin_editar_oferta(id_oferta):
@@ -631,6 +677,7 @@ def configure_admin_routes(app):
                     WHERE id_oferta = %s
                 """, (id_produto, desconto, preco_original, preco_com_desconto, validade, ativa, id_oferta))
                 conn.commit()
+                invalidar_vitrine()
                 
                 # Log
                 if session.get('admin_id'):
@@ -704,6 +751,7 @@ def configure_admin_routes(app):
             # Excluir oferta
             cursor.execute("DELETE FROM ofertas WHERE id_oferta = %s", (id_oferta,))
             conn.commit()
+            invalidar_vitrine()
             
             # Log
             if session.get('admin_id'):
@@ -753,19 +801,18 @@ def configure_admin_routes(app):
                 
                 cursor.execute("SELECT imagens FROM produto WHERE id_produto = %s", (id_produto,))
                 produto_atual = cursor.fetchone()
-                imagens = json.loads(produto_atual['imagens']) if produto_atual['imagens'] else []
+                imagens = decodificar_imagens(produto_atual['imagens'])
+                imagens_anteriores = set(imagens)
                 
                 if 'imagens' in request.files:
                     files = request.files.getlist('imagens')
                     for file in files:
-                        if file and allowed_file(file.filename):
-                            filename = secure_filename(file.filename)
-                            from uuid import uuid4
-                            unique_filename = f"{uuid4().hex}_{filename}"
-                            filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-                            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                            file.save(filepath)
-                            imagens.append(unique_filename)
+                        if file and file.filename:
+                            nome_imagem = salvar_imagem_upload(file)
+                            if nome_imagem:
+                                imagens.append(nome_imagem)
+                            else:
+                                flash(f'⚠️ Arquivo ignorado (não é PNG, JPG, GIF ou WEBP): {file.filename}', 'warning')
                 
                 imagens_remover = request.form.getlist('imagens_remover')
                 imagens = [img for img in imagens if img not in imagens_remover]
@@ -775,8 +822,14 @@ def configure_admin_routes(app):
                     imagens = %s, peso = %s, dimensoes = %s, destaque = %s, ativo = %s WHERE id_produto = %s
                 """, (nome, marca, float(preco), descricao, int(estoque), categoria, json.dumps(imagens) if imagens else None,
                       float(peso) if peso else 0, dimensoes, destaque, ativo, id_produto))
+                salvar_imagens_produto(cursor, id_produto, imagens)
                 
                 conn.commit()
+                invalidar_catalogo()
+                invalidar_vitrine()
+                invalidar_produtos_carrinho()
+                invalidar_contagens('produto')
+                liberar_imagens(cursor, imagens_anteriores - set(imagens))
                 
                 if session.get('admin_id'):
                     try:
@@ -799,12 +852,7 @@ def configure_admin_routes(app):
                     flash('❌ Produto não encontrado.', 'error')
                     return redirect(url_for('admin_produtos'))
                 
-                # Processar imagens para exibição
-                if produto.get('imagens'):
-                    try:
-                        produto['imagens'] = json.loads(produto['imagens'])
-                    except:
-                        produto['imagens'] = []
+                mapear_produto(produto)
                 
                 return render_template('admin/produto_form.html', produto=produto)
         
@@ -913,6 +961,7 @@ def configure_admin_routes(app):
                 if status == 'concluido':
                     cursor.execute("UPDATE diagnosticos SET data_conclusao = NOW() WHERE id_diagnostico = %s", (id_diagnostico,))
                 conn.commit()
+                invalidar_contagens('diagnosticos')
                 flash('✅ Diagnóstico atualizado com sucesso!', 'success')
                 return redirect(url_for('admin_diagnosticos'))
             else:
@@ -964,6 +1013,7 @@ def configure_admin_routes(app):
                 """, (nome, email, telefone, empresa, cargo, interesse, mensagem, status))
                 
                 conn.commit()
+                invalidar_contagens('concorrentes')
                 
                 # Log da ação
                 if session.get('admin_id'):
@@ -1019,6 +1069,7 @@ def configure_admin_routes(app):
                 """, (nome, email, telefone, empresa, cargo, interesse, mensagem, status, observacoes, id_concorrente))
                 
                 conn.commit()
+                invalidar_contagens('concorrentes')
                 
                 # Log da ação
                 if session.get('admin_id'):
@@ -1073,6 +1124,7 @@ def configure_admin_routes(app):
             
             cursor.execute("DELETE FROM concorrentes WHERE id_concorrente = %s", (id_concorrente,))
             conn.commit()
+            invalidar_contagens('concorrentes')
             
             # Log da ação
             if session.get('admin_id'):
@@ -1,6 +1,7 @@
 from flask import render_template, request, redirect, url_for, session, flash
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.database import get_db_connection
+from models.carrinho import associar_carrinho_cliente
 from models.validators import validar_email, validar_cpf, validar_cnpj, formatar_cpf, formatar_cnpj
 from utils.decorators import login_required
 import mysql.connector
@@ -67,6 +68,9 @@ def configure_auth_routes(app):
                         session['usuario_nome'] = usuario['nome']
                         session['usuario_email'] = usuario['email']
                         
+                        # Recupera o carrinho salvo (de outra visita ou dispositivo) e junta com o atual
+                        associar_carrinho_cliente(usuario['id_cliente'])
+                        
                         flash(f'🎉 Bem-vindo de volta, {usuario["nome"]}!', 'success')
                         next_page = request.args.get('next')
                         if next_page:
@@ -156,6 +160,7 @@ def configure_auth_routes(app):
             session['usuario_id'] = cliente_id
             session['usuario_nome'] = nome
             session['usuario_email'] = email
+            associar_carrinho_cliente(cliente_id)
             
             flash(f'🎉 Cadastro realizado com sucesso! Bem-vindo, {nome}!', 'success')
             return redirect(url_for('inicio'))
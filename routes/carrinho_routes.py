@@ -1,15 +1,19 @@
-from flask import render_template, request, flash, redirect, url_for, session
-from models.database import get_db_connection
+from flask import render_template, request, flash, redirect, url_for, session, send_file, abort
+from models.database import get_db_connection, cursor_db
+from models.pedido import criar_pedido, ErroCheckout
+from models.carrinho import carrinho_atual, salvar_carrinho, esvaziar_carrinho, itens_carrinho, obter_produtos
 from utils.decorators import login_required
-from utils.qrcode_generator import gerar_qrcode_pix
+from models.pix import gerar_txid, agendar_qr, gravar_qr, buscar_pedido_pix
+from utils.qrcode_generator import gerar_qrcode_pix, montar_payload
+from config import Config
 import mysql.connector
-import json
+import os
 
 def configure_carrinho_routes(app):
     
     @app.route('/carrinho')
     def carrinho():
-        carrinho_items = session.get('carrinho', [])
+        carrinho_items = itens_carrinho()
         total_itens = sum(item['quantidade'] for item in carrinho_items)
         total_preco = sum(item['preco'] * item['quantidade'] for item in carrinho_items)
         return render_template('carrinho.html', produtos_carrinho=carrinho_items, total_itens=total_itens, total_preco=total_preco, total_geral=total_preco)
@@ -17,99 +21,64 @@ def configure_carrinho_routes(app):
     @app.route('/adicionar-carrinho/<int:id_produto>', methods=['POST'])
     def adicionar_carrinho(id_produto):
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return redirect(url_for('listar_produtos'))
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM produto WHERE id_produto = %s AND ativo = TRUE", (id_produto,))
-            produto = cursor.fetchone()
+            produto = obter_produtos([id_produto]).get(id_produto)
             if not produto:
                 flash('❌ Produto não encontrado.', 'error')
                 return redirect(url_for('listar_produtos'))
-            if 'carrinho' not in session:
-                session['carrinho'] = []
-            carrinho = session['carrinho']
-            produto_no_carrinho = next((item for item in carrinho if item['id_produto'] == id_produto), None)
             quantidade = int(request.form.get('quantidade', 1))
             
-            # 🔥 CORREÇÃO: Processar imagens corretamente
-            imagens_produto = []
-            if produto.get('imagens'):
-                try:
-                    imagens_produto = json.loads(produto['imagens'])
-                except:
-                    # Se não for JSON, usa como array vazio
-                    imagens_produto = []
-            # Se não tiver imagens mas tiver imagem singular, usa ela
-            elif produto.get('imagem'):
-                imagens_produto = [produto['imagem']]
-            
-            if produto_no_carrinho:
-                produto_no_carrinho['quantidade'] += quantidade
-            else:
-                carrinho.append({
-                    'id_produto': produto['id_produto'],
-                    'nome': produto['nome'],
-                    'preco': float(produto['preco']),
-                    'quantidade': quantidade,
-                    'imagens': imagens_produto,  # ← MUDOU para 'imagens' (plural)
-                    'categoria': produto['categoria']
-                })
-            session['carrinho'] = carrinho
-            session.modified = True
+            # O carrinho guarda apenas {id_produto: quantidade}; o resto vem do cache de produtos
+            itens = carrinho_atual()
+            itens[id_produto] = itens.get(id_produto, 0) + quantidade
+            salvar_carrinho(itens)
             flash(f'✅ {produto["nome"]} adicionado ao carrinho!', 'success')
             return redirect(url_for('listar_produtos'))
         except mysql.connector.Error as err:
             flash(f'Erro ao adicionar produto ao carrinho: {err}', 'error')
             return redirect(url_for('listar_produtos'))
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
     @app.route('/remover-carrinho/<int:id_produto>', methods=['POST'])
     def remover_carrinho(id_produto):
-        if 'carrinho' in session:
-            carrinho = session['carrinho']
-            session['carrinho'] = [item for item in carrinho if item['id_produto'] != id_produto]
-            session.modified = True
+        itens = carrinho_atual()
+        if itens:
+            itens.pop(id_produto, None)
+            salvar_carrinho(itens)
             flash('🗑️ Produto removido do carrinho!', 'success')
         return redirect(url_for('carrinho'))
 
     @app.route('/atualizar-carrinho', methods=['POST'])
     def atualizar_carrinho():
-        if 'carrinho' in session:
-            carrinho = session['carrinho']
-            carrinho_dict = {item['id_produto']: item for item in carrinho}
-            carrinho_atualizado = []
+        itens = carrinho_atual()
+        if itens:
+            carrinho_atualizado = {}
             for key, value in request.form.items():
                 if key.startswith('quantidade_'):
                     try:
                         id_produto = int(key.split('_')[1])
                         nova_quantidade = int(value)
-                        if id_produto in carrinho_dict:
-                            item = carrinho_dict[id_produto]
-                            if nova_quantidade > 0:
-                                item['quantidade'] = nova_quantidade
-                                carrinho_atualizado.append(item)
+                        if id_produto in itens and nova_quantidade > 0:
+                            carrinho_atualizado[id_produto] = nova_quantidade
                     except ValueError:
                         continue
-            session['carrinho'] = carrinho_atualizado
-            session.modified = True
+            salvar_carrinho(carrinho_atualizado)
             flash('✅ Carrinho atualizado!', 'success')
         return redirect(url_for('carrinho'))
 
     @app.route('/limpar-carrinho', methods=['POST'])
     def limpar_carrinho():
-        session.pop('carrinho', None)
+        esvaziar_carrinho()
         flash('🗑️ Carrinho limpo!', 'success')
         return redirect(url_for('carrinho'))
 
     @app.route('/gerar-pix/<float:valor>')
     def gerar_pix(valor):
-        qr_base64, copia_cola = gerar_qrcode_pix(valor)
-        return render_template('gerar_pix.html', valor=valor, qr_base64=qr_base64, copia_cola=copia_cola)
+        # ?formato=svg devolve o QR em SVG; ?compacto=1 usa módulos menores e margem mínima
+        formato = 'svg' if request.args.get('formato') == 'svg' else 'png'
+        compacto = request.args.get('compacto') == '1'
+        qr, copia_cola = gerar_qrcode_pix(valor, formato=formato, compacto=compacto)
+        return render_template('gerar_pix.html', valor=valor, copia_cola=copia_cola,
+                               qr_base64=qr if formato == 'png' else None,
+                               qr_svg=qr if formato == 'svg' else None)
 
     @app.route('/finalizar-carrinho', methods=['GET', 'POST'])
     def finalizar_carrinho():
@@ -117,16 +86,7 @@ def configure_carrinho_routes(app):
             flash('⚠️ Faça login para finalizar sua compra.', 'warning')
             return redirect(url_for('login', next=url_for('finalizar_carrinho')))
 
-        produtos_carrinho = session.get('carrinho', [])
-        
-        # 🔥 CORREÇÃO: Garantir que todos os produtos tenham 'imagens' como array
-        for produto in produtos_carrinho:
-            # Se o produto tiver 'imagem' mas não 'imagens', migrar
-            if 'imagem' in produto and ('imagens' not in produto or not produto['imagens']):
-                produto['imagens'] = [produto['imagem']]
-            # Garantir que 'imagens' sempre seja um array
-            if 'imagens' not in produto:
-                produto['imagens'] = []
+        produtos_carrinho = itens_carrinho()
         
         total_geral = sum(item['preco'] * item['quantidade'] for item in produtos_carrinho)
 
@@ -144,54 +104,31 @@ def configure_carrinho_routes(app):
                 return redirect(url_for('carrinho'))
 
             try:
-                conn = get_db_connection()
-                cursor = conn.cursor(dictionary=True)
-
-                # Verificar estoque
-                for item in produtos_carrinho:
-                    cursor.execute("SELECT nome, estoque FROM produto WHERE id_produto = %s", (item['id_produto'],))
-                    produto_db = cursor.fetchone()
-                    if not produto_db:
-                        flash(f"❌ Produto '{item['nome']}' não encontrado.", 'error')
-                        return redirect(url_for('carrinho'))
-                    if produto_db['estoque'] < item['quantidade']:
-                        flash(f"⚠️ Estoque insuficiente de '{produto_db['nome']}'.", 'warning')
-                        return redirect(url_for('carrinho'))
-
-                # Criar pedido
-                cursor.execute("""
-                    INSERT INTO pedidos (id_cliente, total, forma_pagamento, status, data_pedido)
-                    VALUES (%s, %s, %s, %s, NOW())
-                """, (session['usuario_id'], total_geral, pagamento, 'pendente'))
-                pedido_id = cursor.lastrowid
-
-                # Adicionar itens e atualizar estoque
-                for item in produtos_carrinho:
-                    cursor.execute("""
-                        INSERT INTO itens_pedido (id_pedido, id_produto, quantidade, preco_unitario)
-                        VALUES (%s, %s, %s, %s)
-                    """, (pedido_id, item['id_produto'], item['quantidade'], item['preco']))
+                with cursor_db(dictionary=True, commit=True) as cursor:
+                    # Registrar pagamento (antes da reserva, para não segurar as travas de estoque)
                     cursor.execute("""
-                        UPDATE produto SET estoque = estoque - %s WHERE id_produto = %s
-                    """, (item['quantidade'], item['id_produto']))
+                        INSERT INTO pagamentos (nome, email, endereco, metodo, valor)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, (nome, email, endereco, pagamento, total_geral))
 
-                # Registrar pagamento
-                cursor.execute("""
-                    INSERT INTO pagamentos (nome, email, endereco, metodo, valor)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (nome, email, endereco, pagamento, total_geral))
-
-                conn.commit()
+                    # Reserva o estoque (travas em ordem de id + baixa condicional) e grava os itens;
+                    # pedidos PIX não pagos no prazo são cancelados e o estoque volta
+                    minutos_reserva = Config.RESERVA_PIX_MINUTOS if pagamento == 'pix' else None
+                    pix_txid = gerar_txid() if pagamento == 'pix' else None
+                    pedido_id = criar_pedido(cursor, session['usuario_id'], produtos_carrinho, pagamento,
+                                             total_geral, minutos_reserva=minutos_reserva, pix_txid=pix_txid)
 
                 # Gera PIX se for o método escolhido
                 if pagamento == 'pix':
-                    qr_base64, copia_cola = gerar_qrcode_pix(total_geral)
-                    session.pop('carrinho', None)
+                    # O PNG do QR é renderizado em segundo plano e servido por /pix/<pedido_id>.png
+                    agendar_qr(pix_txid, total_geral)
+                    copia_cola = montar_payload(total_geral, pix_txid)
+                    esvaziar_carrinho()
                     flash('🎉 Compra finalizada com sucesso! Escaneie o QR Code para pagar via PIX.', 'success')
                     return render_template(
                         'compra-sucedida.html',
                         valor=total_geral,
-                        qr_base64=qr_base64,
+                        qr_url=url_for('qr_pix_pedido', pedido_id=pedido_id),
                         copia_cola=copia_cola,
                         pedido_id=pedido_id
                     )
@@ -199,14 +136,12 @@ def configure_carrinho_routes(app):
                     flash('💳 Pagamento por cartão/boleto ainda não implementado.', 'info')
                     return redirect(url_for('inicio'))
 
+            except ErroCheckout as erro:
+                flash(str(erro), erro.categoria)
+                return redirect(url_for('carrinho'))
             except mysql.connector.Error as err:
-                conn.rollback()
                 flash(f'❌ Erro ao finalizar compra: {err}', 'error')
                 return redirect(url_for('carrinho'))
-            finally:
-                if conn and conn.is_connected():
-                    cursor.close()
-                    conn.close()
 
         return render_template('finalizar-carrinho.html',
                             produtos_carrinho=produtos_carrinho,
@@ -221,18 +156,23 @@ def configure_carrinho_routes(app):
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            # ✅ ATUALIZA PARA 'concluido' (SEU ENUM CORRETO)
+            # ✅ ATUALIZA PARA 'concluido' (SEU ENUM CORRETO) o último pedido ainda reservado
             cursor.execute("""
                 UPDATE pedidos 
                 SET status = 'concluido' 
                 WHERE id_cliente = %s 
-                AND id_pedido = (
-                    SELECT MAX(id_pedido) FROM pedidos WHERE id_cliente = %s
-                )
-            """, (session['usuario_id'], session['usuario_id']))
+                AND status = 'pendente'
+                AND (reserva_expira_em IS NULL OR reserva_expira_em >= NOW())
+                ORDER BY id_pedido DESC
+                LIMIT 1
+            """, (session['usuario_id'],))
+            confirmado = cursor.rowcount
             
             conn.commit()
             
+            if not confirmado:
+                return {'status': 'error', 'message': 'Reserva expirada ou pedido já processado.'}
+            
             # ✅ MARCA NA SESSION TAMBÉM
             session['pagamento_confirmado'] = True
             session['chegou_finalizar_carrinho'] = True
@@ -250,6 +190,23 @@ def configure_carrinho_routes(app):
                 cursor.close()
                 conn.close()
     
+    @app.route('/pix/<int:pedido_id>.png')
+    @login_required
+    def qr_pix_pedido(pedido_id):
+        """QR Code PIX do pedido (o mesmo enquanto o pedido existir, então pode ficar em cache)"""
+        try:
+            pedido = buscar_pedido_pix(pedido_id)
+        except mysql.connector.Error:
+            abort(503)
+        if not pedido or pedido['id_cliente'] != session.get('usuario_id'):
+            abort(404)
+        # Normalmente já gravado pelo worker; se ainda não, renderiza agora
+        caminho = gravar_qr(pedido['pix_txid'], pedido['total'])
+        resposta = send_file(os.path.abspath(caminho), mimetype='image/png', etag=pedido['pix_txid'],
+                             max_age=Config.PIX_QR_MAX_AGE, conditional=True)
+        resposta.cache_control.private = True
+        return resposta
+
     @app.route('/compra-sucedida')
     def compra_sucedida():
         return render_template('compra-sucedida.html')
\ No newline at end of file
@@ -1,7 +1,7 @@
 from flask import render_template, request, redirect, url_for, session, flash, jsonify
 from models.database import get_db_connection
+from models.produto import mapear_produtos
 from utils.decorators import login_required
-import json
 import mysql.connector
 
 def configure_empresa_routes(app):
@@ -38,15 +38,7 @@ def configure_empresa_routes(app):
                 WHERE pe.id_empresa = %s
                 ORDER BY pe.data_cadastro DESC
             """, (session['empresa_id'],))
-            produtos_empresa = cursor.fetchall()
-            
-            # Processar imagens
-            for produto in produtos_empresa:
-                if produto.get('imagens'):
-                    try:
-                        produto['imagens'] = json.loads(produto['imagens'])
-                    except:
-                        produto['imagens'] = []
+            produtos_empresa = mapear_produtos(cursor.fetchall(), cursor)
             
             # Buscar produtos disponíveis para adicionar
             cursor.execute("""
@@ -133,15 +125,7 @@ def configure_empresa_routes(app):
                 ORDER BY p.nome
             """, (session['empresa_id'],))
             
-            produtos = cursor.fetchall()
-            
-            # Processar imagens
-            for produto in produtos:
-                if produto.get('imagens'):
-                    try:
-                        produto['imagens'] = json.loads(produto['imagens'])
-                    except:
-                        produto['imagens'] = []
+            produtos = mapear_produtos(cursor.fetchall(), cursor)
             
             return jsonify(produtos)
         
@@ -1,5 +1,6 @@
 from flask import render_template, flash, session, redirect, url_for, request, jsonify
 from models.database import get_db_connection
+from models.vitrine import obter_produtos_destaque
 from utils.decorators import login_required
 import json
 import mysql.connector
@@ -9,79 +10,13 @@ def configure_main_routes(app):
     
     @app.route('/')
     def inicio():
-        # ... (código anterior mantido)
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('index.html', produtos_destaque=[])
-            
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT p.* 
-                FROM produto p 
-                WHERE p.ativo = TRUE 
-                ORDER BY p.destaque DESC, p.data_cadastro DESC 
-                LIMIT 8
-            """)
-            produtos_base = cursor.fetchall()
-            
-            cursor.execute("""
-                SELECT o.*, p.nome, p.descricao, p.categoria, p.marca, p.imagens
-                FROM ofertas o
-                JOIN produto p ON o.id_produto = p.id_produto
-                WHERE o.ativa = TRUE 
-                AND (o.validade IS NULL OR o.validade >= CURDATE())
-                AND p.ativo = TRUE
-                ORDER BY o.desconto DESC
-                LIMIT 6
-            """)
-            ofertas = cursor.fetchall()
-            
-            produtos_destaque = []
-            
-            for oferta in ofertas:
-                produto_com_oferta = {
-                    'id_produto': oferta['id_produto'],
-                    'nome': oferta['nome'],
-                    'descricao': oferta['descricao'],
-                    'categoria': oferta['categoria'],
-                    'marca': oferta['marca'],
-                    'preco': oferta['preco_original'],
-                    'preco_com_desconto': oferta['preco_com_desconto'],
-                    'desconto': oferta['desconto'],
-                    'tem_oferta': True,
-                    'imagens': oferta['imagens']
-                }
-                produtos_destaque.append(produto_com_oferta)
-            
-            produtos_base_ids = [p['id_produto'] for p in produtos_destaque]
-            for produto in produtos_base:
-                if produto['id_produto'] not in produtos_base_ids and len(produtos_destaque) < 8:
-                    produto_base = {
-                        'id_produto': produto['id_produto'],
-                        'nome': produto['nome'],
-                        'descricao': produto['descricao'],
-                        'categoria': produto['categoria'],
-                        'marca': produto['marca'],
-                        'preco': produto['preco'],
-                        'preco_com_desconto': produto['preco'],
-                        'desconto': 0,
-                        'tem_oferta': False,
-                        'imagens': produto['imagens']
-                    }
-                    produtos_destaque.append(produto_base)
-            
+            produtos_destaque = obter_produtos_destaque()
             return render_template('index.html', produtos_destaque=produtos_destaque)
             
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar produtos: {err}', 'error')
             return render_template('index.html', produtos_destaque=[])
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
     @app.route('/empresas-vendedoras')
     def empresas_vendedoras():
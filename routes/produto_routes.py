@@ -1,165 +1,177 @@
 from flask import render_template, request, flash, redirect, url_for, session
-from models.database import get_db_connection
+from models.database import get_db_connection, cursor_db
+from models.busca import montar_filtro_busca, montar_relevancia
+from models.catalogo import cache_catalogo, contar_facetas, listar_categorias, listar_marcas
+from models.produto import mapear_produto, mapear_produtos
+from models.avaliacoes import (anexar_resumos, cliente_comprou_produto, listar_avaliacoes_produto,
+                               listar_produtos_para_avaliar, obter_resumo_avaliacoes)
+from models.carrinho import carrinho_atual
 from utils.decorators import login_required
-import json
+from utils.paginacao import codificar_cursor, decodificar_cursor, obter_tamanho_pagina, estimar_total
+from config import Config
 import mysql.connector
 
+def contar_resultados(cursor, where, params):
+    """Contagem exata dos resultados da busca (resolvida pelo índice FULLTEXT)"""
+    cursor.execute(f"SELECT COUNT(*) AS total FROM produto WHERE {where}", params)
+    return cursor.fetchone()['total']
+
 def configure_produto_routes(app):
     
     def usuario_comprou_produto(usuario_id, produto_id):
-        """Verifica se o usuário comprou o produto"""
+        """Verifica se o usuário comprou o produto (pedido concluído ou entregue)"""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 1 FROM itens_pedido ip
-                JOIN pedidos p ON ip.id_pedido = p.id_pedido
-                WHERE p.id_cliente = %s AND ip.id_produto = %s AND p.status = 'entregue'
-            """, (usuario_id, produto_id))
-            
-            resultado = cursor.fetchone()
-            return resultado is not None
-            
+            return cliente_comprou_produto(usuario_id, produto_id)
         except mysql.connector.Error as err:
             print(f"Erro ao verificar compra: {err}")
             return False
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
     
     @app.route('/produtos')
     def listar_produtos():
+        categoria = request.args.get('categoria')
+        marca = request.args.get('marca')
+        busca = request.args.get('busca')
+        por_pagina = obter_tamanho_pagina(request.args.get('por_pagina'),
+                                          Config.PRODUTOS_POR_PAGINA, Config.PRODUTOS_POR_PAGINA_MAX)
+        cursor_pagina = decodificar_cursor(request.args.get('cursor'))
+        
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('produtos.html', produtos=[], categorias=[], marcas=[])
-            
-            cursor = conn.cursor(dictionary=True)
-            categoria = request.args.get('categoria')
-            marca = request.args.get('marca')
-            busca = request.args.get('busca')
-            
-            query = "SELECT * FROM produto WHERE ativo = TRUE"
-            params = []
-            
-            if categoria:
-                query += " AND categoria = %s"
-                params.append(categoria)
-            
-            if marca:
-                query += " AND marca = %s"
-                params.append(marca)
-            
-            if busca:
-                query += " AND (nome LIKE %s OR descricao LIKE %s)"
-                params.extend([f"%{busca}%", f"%{busca}%"])
-            
-            query += " ORDER BY data_cadastro DESC"
-            
-            cursor.execute(query, params)
-            produtos = cursor.fetchall()
-            
-            # PROCESSAR IMAGENS JSON
-            for produto in produtos:
-                if produto.get('imagens'):
-                    try:
-                        produto['imagens'] = json.loads(produto['imagens'])
-                    except:
-                        produto['imagens'] = []
-            
-            cursor.execute("SELECT DISTINCT categoria FROM produto WHERE ativo = TRUE ORDER BY categoria")
-            categorias = [row['categoria'] for row in cursor.fetchall()]
-            
-            cursor.execute("SELECT DISTINCT marca FROM produto WHERE ativo = TRUE ORDER BY marca")
-            marcas = [row['marca'] for row in cursor.fetchall()]
-            
-            return render_template('produtos.html', produtos=produtos, categorias=categorias, marcas=marcas)
+            with cursor_db(dictionary=True) as cursor:
+                where = "ativo = TRUE"
+                params = []
+                
+                if categoria:
+                    where += " AND categoria = %s"
+                    params.append(categoria)
+                
+                if marca:
+                    where += " AND marca = %s"
+                    params.append(marca)
+                
+                filtro_busca, params_busca = montar_filtro_busca(busca)
+                if filtro_busca:
+                    where += f" AND {filtro_busca}"
+                    params.extend(params_busca)
+                
+                if filtro_busca:
+                    # BUSCA TEXTUAL: ordenada por relevância, paginada por posição
+                    total_estimado = cache_catalogo.obter_ou_calcular(
+                        ('produtos', categoria, marca, busca),
+                        lambda: contar_resultados(cursor, where, params)
+                    )
+                    
+                    posicao = 0
+                    if cursor_pagina:
+                        try:
+                            posicao = max(0, int(cursor_pagina.get('pos', 0)))
+                        except (TypeError, ValueError):
+                            posicao = 0
+                    relevancia, params_relevancia = montar_relevancia(busca)
+                    cursor.execute(f"""
+                        SELECT *, {relevancia} AS relevancia FROM produto WHERE {where}
+                        ORDER BY relevancia DESC, id_produto DESC LIMIT %s OFFSET %s
+                    """, params_relevancia + params + [por_pagina + 1, posicao])
+                    produtos = cursor.fetchall()
+                    
+                    tem_proxima = len(produtos) > por_pagina
+                    produtos = produtos[:por_pagina]
+                    tem_anterior = posicao > 0
+                    cursores = (
+                        {'pos': max(0, posicao - por_pagina)},
+                        {'pos': posicao + por_pagina}
+                    )
+                else:
+                    # Total estimado pelo otimizador, reaproveitado entre as páginas do mesmo filtro
+                    total_estimado = cache_catalogo.obter_ou_calcular(
+                        ('produtos', categoria, marca, busca),
+                        lambda: estimar_total(cursor, 'produto', where, params)
+                    )
+                    
+                    # PAGINAÇÃO POR CURSOR (keyset) EM (data_cadastro, id_produto)
+                    if not (cursor_pagina and cursor_pagina.get('data') and cursor_pagina.get('id')):
+                        cursor_pagina = None
+                    anterior = bool(cursor_pagina and cursor_pagina.get('dir') == 'ant')
+                    query = f"SELECT * FROM produto WHERE {where}"
+                    params_pagina = list(params)
+                    if cursor_pagina:
+                        comparador = '>' if anterior else '<'
+                        query += f" AND (data_cadastro {comparador} %s OR (data_cadastro = %s AND id_produto {comparador} %s))"
+                        params_pagina.extend([cursor_pagina['data'], cursor_pagina['data'], cursor_pagina['id']])
+                    ordem = "ASC" if anterior else "DESC"
+                    query += f" ORDER BY data_cadastro {ordem}, id_produto {ordem} LIMIT %s"
+                    params_pagina.append(por_pagina + 1)
+                    
+                    cursor.execute(query, params_pagina)
+                    produtos = cursor.fetchall()
+                    
+                    mais_resultados = len(produtos) > por_pagina
+                    produtos = produtos[:por_pagina]
+                    if anterior:
+                        produtos.reverse()
+                        tem_anterior, tem_proxima = mais_resultados, True
+                    else:
+                        tem_anterior, tem_proxima = cursor_pagina is not None, mais_resultados
+                    cursores = (
+                        {'dir': 'ant', 'data': produtos[0]['data_cadastro'], 'id': produtos[0]['id_produto']}
+                        if produtos else None,
+                        {'dir': 'prox', 'data': produtos[-1]['data_cadastro'], 'id': produtos[-1]['id_produto']}
+                        if produtos else None
+                    )
+                
+                mapear_produtos(produtos, cursor)
+                anexar_resumos(cursor, produtos)
+            
+            # FACETAS (em cache; contagens respeitam os filtros aplicados)
+            categorias = [c['categoria'] for c in listar_categorias()]
+            marcas = [m['marca'] for m in listar_marcas()]
+            facetas = contar_facetas(categoria, marca, busca)
+            
+            def url_pagina(valores):
+                token = codificar_cursor(valores)
+                return url_for('listar_produtos', **{**request.args.to_dict(), 'cursor': token})
+            
+            paginacao = {
+                'total_estimado': total_estimado,
+                'por_pagina': por_pagina,
+                'url_anterior': url_pagina(cursores[0]) if produtos and tem_anterior else None,
+                'url_proxima': url_pagina(cursores[1]) if produtos and tem_proxima else None,
+            }
+            
+            return render_template('produtos.html', produtos=produtos, categorias=categorias, marcas=marcas,
+                                   facetas=facetas, paginacao=paginacao)
         
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar produtos: {err}', 'error')
             return render_template('produtos.html', produtos=[], categorias=[], marcas=[])
-        
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
     @app.route('/produto/<int:id_produto>')
     def detalhes_produto(id_produto):
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return redirect(url_for('listar_produtos'))
-            
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM produto WHERE id_produto = %s AND ativo = TRUE", (id_produto,))
-            produto = cursor.fetchone()
+            with cursor_db(dictionary=True) as cursor:
+                cursor.execute("SELECT * FROM produto WHERE id_produto = %s AND ativo = TRUE", (id_produto,))
+                produto = cursor.fetchone()
             
             if not produto:
                 flash('❌ Produto não encontrado.', 'error')
                 return redirect(url_for('listar_produtos'))
             
-            # PROCESSAR IMAGENS JSON
-            if produto.get('imagens'):
-                try:
-                    produto['imagens'] = json.loads(produto['imagens'])
-                except Exception as e:
-                    print(f"DEBUG - Erro ao processar: {e}")
-                    produto['imagens'] = []
-            
-            # BUSCAR AVALIAÇÕES E ESTATÍSTICAS
-            cursor.execute("""
-                SELECT a.*, c.nome as cliente_nome FROM avaliacoes a
-                JOIN clientes c ON a.id_cliente = c.id_cliente
-                WHERE a.id_produto = %s AND a.aprovado = TRUE ORDER BY a.data_avaliacao DESC
-            """, (id_produto,))
-            avaliacoes = cursor.fetchall()
-            
-            # BUSCAR ESTATÍSTICAS DAS AVALIAÇÕES
-            cursor.execute("""
-                SELECT 
-                    AVG(nota) as media,
-                    COUNT(*) as total_avaliacoes,
-                    SUM(CASE WHEN nota = 5 THEN 1 ELSE 0 END) as cinco_estrelas,
-                    SUM(CASE WHEN nota = 4 THEN 1 ELSE 0 END) as quatro_estrelas,
-                    SUM(CASE WHEN nota = 3 THEN 1 ELSE 0 END) as tres_estrelas,
-                    SUM(CASE WHEN nota = 2 THEN 1 ELSE 0 END) as duas_estrelas,
-                    SUM(CASE WHEN nota = 1 THEN 1 ELSE 0 END) as uma_estrela
-                FROM avaliacoes 
-                WHERE id_produto = %s AND aprovado = TRUE
-            """, (id_produto,))
+            mapear_produto(produto)
             
-            media_avaliacoes = cursor.fetchone()
-            
-            # GARANTIR QUE media_avaliacoes NÃO SEJA None
-            if not media_avaliacoes:
-                media_avaliacoes = {
-                    'media': 0,
-                    'total_avaliacoes': 0,
-                    'cinco_estrelas': 0,
-                    'quatro_estrelas': 0,
-                    'tres_estrelas': 0,
-                    'duas_estrelas': 0,
-                    'uma_estrela': 0
-                }
+            # PRIMEIRA PÁGINA DE AVALIAÇÕES (as demais via JSON) E ESTATÍSTICAS PRÉ-CALCULADAS
+            avaliacoes, proxima = listar_avaliacoes_produto(id_produto, Config.AVALIACOES_POR_PAGINA)
+            media_avaliacoes = obter_resumo_avaliacoes(id_produto)
+            url_mais_avaliacoes = url_for('avaliacao.listar_avaliacoes', id_produto=id_produto,
+                                          cursor=codificar_cursor(proxima)) if proxima else None
             
             return render_template('produto_detalhes.html', 
                                 produto=produto, 
                                 avaliacoes=avaliacoes,
-                                media_avaliacoes=media_avaliacoes)
+                                media_avaliacoes=media_avaliacoes,
+                                url_mais_avaliacoes=url_mais_avaliacoes)
         
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar produto: {err}', 'error')
             return redirect(url_for('listar_produtos'))
-        
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
     @app.route('/avaliar-produto/<int:id_produto>', methods=['POST'])
     @login_required
@@ -182,47 +194,36 @@ def configure_produto_routes(app):
             return redirect(url_for('detalhes_produto', id_produto=id_produto))
         
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return redirect(url_for('detalhes_produto', id_produto=id_produto))
-            
-            cursor = conn.cursor()
-            
-            if 'usuario_id' in session:
-                # Verificar se já avaliou
-                cursor.execute("SELECT id_avaliacao FROM avaliacoes WHERE id_cliente = %s AND id_produto = %s", 
-                             (session['usuario_id'], id_produto))
-                if cursor.fetchone():
-                    flash('⚠️ Você já avaliou este produto.', 'warning')
-                    return redirect(url_for('detalhes_produto', id_produto=id_produto))
-                
-                cursor.execute("""
-                    INSERT INTO avaliacoes (id_cliente, id_produto, nota, titulo, comentario, tipo_avaliador)
-                    VALUES (%s, %s, %s, %s, %s, 'cliente')
-                """, (session['usuario_id'], id_produto, nota, titulo, comentario))
-            
-            elif 'empresa_id' in session:
-                cursor.execute("SELECT id_avaliacao FROM avaliacoes WHERE id_empresa = %s AND id_produto = %s", 
-                             (session['empresa_id'], id_produto))
-                if cursor.fetchone():
-                    flash('⚠️ Sua empresa já avaliou este produto.', 'warning')
-                    return redirect(url_for('detalhes_produto', id_produto=id_produto))
+            with cursor_db(commit=True) as cursor:
+                if 'usuario_id' in session:
+                    # Verificar se já avaliou
+                    cursor.execute("SELECT id_avaliacao FROM avaliacoes WHERE id_cliente = %s AND id_produto = %s", 
+                                 (session['usuario_id'], id_produto))
+                    if cursor.fetchone():
+                        flash('⚠️ Você já avaliou este produto.', 'warning')
+                        return redirect(url_for('detalhes_produto', id_produto=id_produto))
+                    
+                    cursor.execute("""
+                        INSERT INTO avaliacoes (id_cliente, id_produto, nota, titulo, comentario, tipo_avaliador, aprovado)
+                        VALUES (%s, %s, %s, %s, %s, 'cliente', FALSE)
+                    """, (session['usuario_id'], id_produto, nota, titulo, comentario))
                 
-                cursor.execute("""
-                    INSERT INTO avaliacoes (id_empresa, id_produto, nota, titulo, comentario, tipo_avaliador)
-                    VALUES (%s, %s, %s, %s, %s, 'empresa')
-                """, (session['empresa_id'], id_produto, nota, titulo, comentario))
+                elif 'empresa_id' in session:
+                    cursor.execute("SELECT id_avaliacao FROM avaliacoes WHERE id_empresa = %s AND id_produto = %s", 
+                                 (session['empresa_id'], id_produto))
+                    if cursor.fetchone():
+                        flash('⚠️ Sua empresa já avaliou este produto.', 'warning')
+                        return redirect(url_for('detalhes_produto', id_produto=id_produto))
+                    
+                    cursor.execute("""
+                        INSERT INTO avaliacoes (id_empresa, id_produto, nota, titulo, comentario, tipo_avaliador, aprovado)
+                        VALUES (%s, %s, %s, %s, %s, 'empresa', FALSE)
+                    """, (session['empresa_id'], id_produto, nota, titulo, comentario))
             
-            conn.commit()
             flash('✅ Avaliação enviada com sucesso! Será analisada pela nossa equipe.', 'success')
         
         except mysql.connector.Error as err:
             flash(f'Erro ao enviar avaliação: {err}', 'error')
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
         
         return redirect(url_for('detalhes_produto', id_produto=id_produto))
 
@@ -245,26 +246,12 @@ def configure_produto_routes(app):
             conn = get_db_connection()
             cursor = conn.cursor(dictionary=True)
             
-            # 🔥 ATUALIZAR: Buscar produtos do carrinho atual (não precisa ser "entregue" ainda)
-            # Como o pagamento acabou de ser confirmado, vamos buscar os produtos do pedido mais recente
-            cursor.execute("""
-                SELECT p.*, ip.id_pedido, ip.quantidade 
-                FROM itens_pedido ip
-                JOIN pedidos pd ON ip.id_pedido = pd.id_pedido
-                JOIN produto p ON ip.id_produto = p.id_produto
-                LEFT JOIN avaliacoes a ON p.id_produto = a.id_produto AND a.id_cliente = %s
-                WHERE pd.id_cliente = %s 
-                AND pd.id_pedido = (
-                    SELECT MAX(id_pedido) FROM pedidos WHERE id_cliente = %s
-                )
-                AND a.id_avaliacao IS NULL
-            """, (session['usuario_id'], session['usuario_id'], session['usuario_id']))
-            
-            produtos_para_avaliar = cursor.fetchall()
+            # Produtos pagos ainda sem avaliação (o pedido confirmado já entra em produtos_comprados)
+            produtos_para_avaliar = listar_produtos_para_avaliar(session['usuario_id'], cursor)
             
             # Se não encontrou produtos no pedido recente, busca produtos do carrinho da session
-            if not produtos_para_avaliar and session.get('carrinho'):
-                produtos_ids = [str(item['id_produto']) for item in session['carrinho']]
+            if not produtos_para_avaliar:
+                produtos_ids = list(carrinho_atual())
                 if produtos_ids:
                     placeholders = ','.join(['%s'] * len(produtos_ids))
                     cursor.execute(f"""
@@ -277,13 +264,7 @@ def configure_produto_routes(app):
                     
                     produtos_para_avaliar = cursor.fetchall()
             
-            # PROCESSAR IMAGENS JSON
-            for produto in produtos_para_avaliar:
-                if produto.get('imagens'):
-                    try:
-                        produto['imagens'] = json.loads(produto['imagens'])
-                    except:
-                        produto['imagens'] = []
+            mapear_produtos(produtos_para_avaliar, cursor)
             
             # 🔥 ADICIONAR: Se não há produtos para avaliar, mostrar mensagem
             if not produtos_para_avaliar:
@@ -304,87 +285,15 @@ def configure_produto_routes(app):
     @app.route('/categorias')
     def categorias():
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('categorias.html', categorias=[])
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT categoria, COUNT(*) as total_produtos FROM produto 
-                WHERE ativo = TRUE GROUP BY categoria ORDER BY categoria
-            """)
-            categorias_lista = cursor.fetchall()
-            return render_template('categorias.html', categorias=categorias_lista)
+            return render_template('categorias.html', categorias=listar_categorias())
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar categorias: {err}', 'error')
             return render_template('categorias.html', categorias=[])
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
 
     @app.route('/marcas')
     def marcas():
         try:
-            conn = get_db_connection()
-            if not conn:
-                flash('Erro ao conectar ao banco de dados.', 'error')
-                return render_template('marcas.html', marcas=[])
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT marca, COUNT(*) as total_produtos, MIN(preco) as preco_minimo, MAX(preco) as preco_maximo
-                FROM produto WHERE ativo = TRUE GROUP BY marca ORDER BY marca
-            """)
-            marcas_lista = cursor.fetchall()
-            return render_template('marcas.html', marcas=marcas_lista)
+            return render_template('marcas.html', marcas=listar_marcas())
         except mysql.connector.Error as err:
             flash(f'Erro ao carregar marcas: {err}', 'error')
             return render_template('marcas.html', marcas=[])
-        finally:
-            if conn and conn.is_connected():
-                cursor.close()
-                conn.close()
-
-# FUNÇÕES PARA AVALIAÇÕES - ADICIONE ISSO NO FINAL DO ARQUIVO
-def buscar_avaliacoes_produto(id_produto):
-    """Busca todas as avaliações de um produto"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    cursor.execute("""
-        SELECT a.*, c.nome as cliente_nome 
-        FROM avaliacoes a
-        JOIN clientes c ON a.id_cliente = c.id_cliente
-        WHERE a.id_produto = %s AND a.aprovado = TRUE 
-        ORDER BY a.data_avaliacao DESC
-    """, (id_produto,))
-    
-    avaliacoes = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    return avaliacoes
-
-def calcular_media_avaliacoes(id_produto):
-    """Calcula a média das avaliações de um produto"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    cursor.execute("""
-        SELECT 
-            AVG(nota) as media,
-            COUNT(*) as total_avaliacoes,
-            SUM(CASE WHEN nota = 5 THEN 1 ELSE 0 END) as cinco_estrelas,
-            SUM(CASE WHEN nota = 4 THEN 1 ELSE 0 END) as quatro_estrelas,
-            SUM(CASE WHEN nota = 3 THEN 1 ELSE 0 END) as tres_estrelas,
-            SUM(CASE WHEN nota = 2 THEN 1 ELSE 0 END) as duas_estrelas,
-            SUM(CASE WHEN nota = 1 THEN 1 ELSE 0 END) as uma_estrela
-        FROM avaliacoes 
-        WHERE id_produto = %s AND aprovado = TRUE
-    """, (id_produto,))
-    
-    resultado = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    
-    return resultado
\ No newline at end of file
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Cache em memória com expiração por item, seguro para threads"""
+
+    def __init__(self, ttl=60, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self._calculando = {}
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return padrao
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._itens[chave]
+                return padrao
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def obter_ou_calcular(self, chave, funcao, ttl=None):
+        """Retorna o valor em cache ou calcula uma única vez, mesmo com várias threads pedindo a mesma chave"""
+        sentinela = object()
+        valor = self.obter(chave, sentinela)
+        if valor is not sentinela:
+            return valor
+
+        with self._lock:
+            lock_chave = self._calculando.setdefault(chave, threading.Lock())
+
+        with lock_chave:
+            valor = self.obter(chave, sentinela)
+            if valor is sentinela:
+                valor = funcao()
+                self.definir(chave, valor, ttl)
+
+        with self._lock:
+            self._calculando.pop(chave, None)
+        return valor
+
+    def invalidar(self, chave=None):
+        """Remove uma chave (ou todo o cache quando chave é None)"""
+        with self._lock:
+            if chave is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(chave, None)
+
+    def invalidar_prefixo(self, prefixo):
+        """Remove as chaves-tupla cujo primeiro elemento é o prefixo informado"""
+        with self._lock:
+            for chave in [c for c in self._itens if isinstance(c, tuple) and c and c[0] == prefixo]:
+                del self._itens[chave]
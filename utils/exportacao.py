@@ -0,0 +1,86 @@
+"""
+Exportação de listagens do painel em CSV por streaming.
+
+A consulta roda em um cursor não bufferizado (as linhas ficam no servidor e são
+lidas em lotes de EXPORTACAO_LOTE), e cada lote vira um pedaço da resposta
+assim que é lido. A memória fica constante independentemente do tamanho da
+tabela e o download começa sem esperar a consulta terminar.
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from flask import Response
+from mysql.connector import Error
+
+from config import Config
+from models.database import obter_pool
+
+PREFIXOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _liberar(conn, concluida):
+    # Um resultado não bufferizado lido pela metade deixa a conexão inutilizável;
+    # derruba o socket para que o pool descarte a conexão em vez de reaproveitá-la.
+    if not concluida:
+        try:
+            conn.disconnect()
+        except Error:
+            pass
+    conn.close()
+
+
+def _celula(valor):
+    # Texto vindo de formulários públicos não pode virar fórmula ao abrir no Excel
+    if isinstance(valor, str) and valor[:1] in PREFIXOS_FORMULA:
+        return "'" + valor
+    return valor
+
+
+def exportar_csv(query, params, cabecalho, nome_arquivo, lote=None):
+    """Resposta CSV gerada em lotes a partir de query; erros na consulta são levantados antes do envio.
+
+    Sem cabecalho, usa os nomes das colunas retornadas pela consulta.
+    """
+    lote = lote or Config.EXPORTACAO_LOTE
+    # Conexão própria: o gerador continua rodando depois do teardown da requisição
+    conn = obter_pool().obter()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+    except Error:
+        _liberar(conn, False)
+        raise
+    if cabecalho is None:
+        cabecalho = [coluna[0] for coluna in cursor.description]
+
+    estado = {'concluida': False}
+
+    def gerar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, delimiter=';')
+        # BOM para o Excel reconhecer UTF-8 nos acentos
+        escritor.writerow(cabecalho)
+        yield '\ufeff' + buffer.getvalue()
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                break
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerows([_celula(valor) for valor in linha] for linha in linhas)
+            yield buffer.getvalue()
+        cursor.close()
+        estado['concluida'] = True
+
+    nome = f"{nome_arquivo}_{datetime.now():%Y%m%d_%H%M}.csv"
+    resposta = Response(gerar(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename="{nome}"',
+        'X-Accel-Buffering': 'no',
+        'Cache-Control': 'no-store',
+    })
+    # A liberação fica na resposta, não no gerador: em HEAD (ou se o servidor nunca
+    # iterar o corpo) o gerador não chega a iniciar e um finally dele não rodaria.
+    resposta.call_on_close(lambda: _liberar(conn, estado['concluida']))
+    return resposta
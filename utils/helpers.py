@@ -1,13 +1,9 @@
-import json
 from datetime import datetime
+from models.produto import decodificar_imagens
 
 def from_json_filter(value):
-    if value:
-        try:
-            return json.loads(value)
-        except:
-            return []
-    return []
+    # Listas já decodificadas passam direto; texto JSON usa o decodificador com memo
+    return decodificar_imagens(value)
 
 def calcular_tempo_mercado(data_cadastro):
     if data_cadastro:
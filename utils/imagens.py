@@ -0,0 +1,193 @@
+"""
+Pipeline de imagens dos produtos.
+
+O original enviado é gravado com nome derivado do conteúdo (SHA-256): o mesmo
+arquivo enviado para vários produtos é guardado uma vez só, e como o nome
+muda junto com o conteúdo as URLs podem ser cacheadas para sempre. As
+variantes redimensionadas (WebP e JPEG, uma por largura de
+MINIATURAS_LARGURAS) são geradas em segundo plano por um pool de threads.
+Enquanto uma variante não existe, os templates recebem o arquivo original.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from PIL import Image, ImageOps
+
+from config import Config
+from utils.uploads import UploadEmDisco
+
+PASTA_MINIATURAS = os.path.join(Config.UPLOAD_FOLDER, 'miniaturas')
+FORMATOS_MINIATURA = {'webp': 'WEBP', 'jpg': 'JPEG'}
+PREFIXO_URL_UPLOADS = '/' + Config.UPLOAD_FOLDER.replace(os.sep, '/').strip('/') + '/'
+NOME_CONTEUDO = re.compile(r'^(miniaturas/)?[0-9a-f]{64}(_\d+)?\.[a-z0-9]+$')
+
+_executor = ThreadPoolExecutor(max_workers=Config.MINIATURAS_WORKERS, thread_name_prefix='miniaturas')
+_lock = threading.Lock()
+_agendadas = set()
+_prontas = set()
+_falhas = set()
+
+
+def _caminho_static(caminho):
+    """Caminho relativo à pasta static, para url_for('static', filename=...)"""
+    return os.path.relpath(caminho, 'static').replace(os.sep, '/')
+
+
+def nome_miniatura(nome, largura, formato):
+    return f"{os.path.splitext(nome)[0]}_{largura}.{formato}"
+
+
+def salvar_imagem_upload(arquivo):
+    """Armazena o upload com nome pelo hash do conteúdo e agenda as miniaturas.
+
+    Retorna o nome gravado, ou None se o conteúdo não for uma imagem aceita
+    (o tipo vem dos primeiros bytes, não da extensão enviada).
+    """
+    recebido = arquivo.stream
+    if not isinstance(recebido, UploadEmDisco):
+        # Requisição sem o parser em streaming: copia em blocos para o mesmo destino
+        recebido = UploadEmDisco()
+        shutil.copyfileobj(arquivo.stream, recebido, 1024 * 1024)
+
+    tipo = recebido.tipo
+    if tipo is None:
+        recebido.close()
+        return None
+
+    nome = f"{recebido.sha256}.{tipo}"
+    # Conteúdo já armazenado: a cópia é descartada e a data renovada (protege da coleta de órfãos)
+    recebido.promover(os.path.join(Config.UPLOAD_FOLDER, nome))
+
+    agendar_miniaturas(nome)
+    return nome
+
+
+def armazenar_por_conteudo(nome):
+    """Cria (se preciso) a cópia endereçada por conteúdo de um upload antigo; retorna o novo nome"""
+    caminho = os.path.join(Config.UPLOAD_FOLDER, nome)
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as origem:
+        for bloco in iter(lambda: origem.read(1024 * 1024), b''):
+            sha.update(bloco)
+    extensao = nome.rsplit('.', 1)[1].lower() if '.' in nome else 'bin'
+    novo = f"{sha.hexdigest()}.{'jpg' if extensao == 'jpeg' else extensao}"
+    destino = os.path.join(Config.UPLOAD_FOLDER, novo)
+    if not os.path.exists(destino):
+        try:
+            os.link(caminho, destino)
+        except OSError:
+            shutil.copy2(caminho, destino)
+    return novo
+
+
+def eh_nome_conteudo(nome):
+    """Indica se o arquivo segue o padrão endereçado por conteúdo (<sha256>.<ext>)"""
+    return bool(NOME_CONTEUDO.match(nome))
+
+
+def listar_uploads():
+    """Nomes dos originais armazenados (sem as miniaturas)"""
+    if not os.path.isdir(Config.UPLOAD_FOLDER):
+        return []
+    return [nome for nome in os.listdir(Config.UPLOAD_FOLDER)
+            if os.path.isfile(os.path.join(Config.UPLOAD_FOLDER, nome)) and not nome.endswith('.tmp')]
+
+
+def idade_upload(nome):
+    """Segundos desde a última gravação do original (None se não existir)"""
+    try:
+        return time.time() - os.path.getmtime(os.path.join(Config.UPLOAD_FOLDER, nome))
+    except OSError:
+        return None
+
+
+def remover_arquivos_imagem(nome):
+    """Apaga o original e todas as suas variantes"""
+    caminhos = [os.path.join(Config.UPLOAD_FOLDER, nome)]
+    for largura in Config.MINIATURAS_LARGURAS.values():
+        for formato in FORMATOS_MINIATURA:
+            caminhos.append(os.path.join(PASTA_MINIATURAS, nome_miniatura(nome, largura, formato)))
+    for caminho in caminhos:
+        _prontas.discard(caminho)
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def gerar_miniaturas(nome):
+    """Gera todas as variantes de uma imagem (executado nas threads do pool)"""
+    try:
+        os.makedirs(PASTA_MINIATURAS, exist_ok=True)
+        with Image.open(os.path.join(Config.UPLOAD_FOLDER, nome)) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA')
+
+            for largura in Config.MINIATURAS_LARGURAS.values():
+                imagem = original.copy()
+                imagem.thumbnail((largura, largura), Image.LANCZOS)
+                for formato, formato_pil in FORMATOS_MINIATURA.items():
+                    variante = imagem
+                    if formato == 'jpg' and imagem.mode == 'RGBA':
+                        # JPEG não tem transparência: compõe sobre fundo branco
+                        variante = Image.new('RGB', imagem.size, (255, 255, 255))
+                        variante.paste(imagem, mask=imagem.getchannel('A'))
+                    caminho = os.path.join(PASTA_MINIATURAS, nome_miniatura(nome, largura, formato))
+                    temporario = f"{caminho}.tmp"
+                    variante.save(temporario, formato_pil, quality=Config.MINIATURAS_QUALIDADE, optimize=True)
+                    os.replace(temporario, caminho)  # quem lê nunca vê arquivo pela metade
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"❌ Erro ao gerar miniaturas de {nome}: {e}")
+        with _lock:
+            _falhas.add(nome)
+    finally:
+        with _lock:
+            _agendadas.discard(nome)
+
+
+def agendar_miniaturas(nome):
+    """Coloca a geração das variantes na fila (uma vez por imagem)"""
+    with _lock:
+        if nome in _agendadas or nome in _falhas:
+            return
+        _agendadas.add(nome)
+    _executor.submit(gerar_miniaturas, nome)
+
+
+def url_miniatura(nome, tamanho='m', formato='webp'):
+    """Filtro de template: caminho da variante pronta ou, na falta dela, do original"""
+    if not nome:
+        return _caminho_static(Config.UPLOAD_FOLDER)
+    original = _caminho_static(os.path.join(Config.UPLOAD_FOLDER, nome))
+    largura = Config.MINIATURAS_LARGURAS.get(tamanho)
+    if not largura or formato not in FORMATOS_MINIATURA:
+        return original
+
+    caminho = os.path.join(PASTA_MINIATURAS, nome_miniatura(nome, largura, formato))
+    if caminho in _prontas:
+        return _caminho_static(caminho)
+    if os.path.exists(caminho):
+        _prontas.add(caminho)
+        return _caminho_static(caminho)
+
+    # Imagens antigas (anteriores ao pipeline) ganham as variantes no primeiro acesso
+    if os.path.exists(os.path.join(Config.UPLOAD_FOLDER, nome)):
+        agendar_miniaturas(nome)
+    return original
+
+
+def aplicar_cache_imutavel(resposta):
+    """after_request: URLs endereçadas por conteúdo nunca mudam, então o navegador pode guardá-las"""
+    caminho = request.path
+    if (resposta.status_code in (200, 304) and caminho.startswith(PREFIXO_URL_UPLOADS)
+            and eh_nome_conteudo(caminho[len(PREFIXO_URL_UPLOADS):])):
+        resposta.headers['Cache-Control'] = f'public, max-age={Config.UPLOADS_CACHE_MAX_AGE}, immutable'
+    return resposta
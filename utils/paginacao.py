@@ -0,0 +1,161 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import url_for
+
+from config import Config
+from utils.cache import CacheTTL
+
+
+def codificar_cursor(valores):
+    """Serializa os valores da última linha exibida em um token seguro para a query string"""
+    dados = {}
+    for chave, valor in valores.items():
+        if isinstance(valor, datetime):
+            dados[chave] = {'dt': valor.isoformat()}
+        else:
+            dados[chave] = valor
+    texto = json.dumps(dados, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Inverso de codificar_cursor; retorna None para tokens ausentes ou inválidos"""
+    if not token:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        dados = json.loads(texto)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(dados, dict):
+        return None
+    for chave, valor in dados.items():
+        if isinstance(valor, dict) and 'dt' in valor:
+            try:
+                dados[chave] = datetime.fromisoformat(valor['dt'])
+            except (TypeError, ValueError):
+                return None
+    return dados
+
+
+def obter_tamanho_pagina(valor, padrao=24, maximo=60):
+    """Converte o parâmetro de tamanho de página, limitando entre 1 e o máximo"""
+    try:
+        tamanho = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return max(1, min(tamanho, maximo))
+
+
+def estimar_total(cursor, tabela, where, params):
+    """Estimativa de linhas a partir do plano do otimizador (EXPLAIN), sem varrer a tabela"""
+    cursor.execute(f"EXPLAIN SELECT 1 FROM {tabela} WHERE {where}", params)
+    linhas = cursor.fetchall()
+    if not linhas:
+        return 0
+    linha = linhas[0]
+    if not isinstance(linha, dict):
+        colunas = [c[0] for c in cursor.description]
+        linha = dict(zip(colunas, linha))
+    total = float(linha.get('rows') or 0) * float(linha.get('filtered') or 100) / 100
+    return int(round(total))
+
+
+_cache_contagens = CacheTTL(ttl=Config.ADMIN_CONTAGEM_CACHE_TTL, max_itens=256)
+
+
+def invalidar_contagens(tabela):
+    """Descarta os totais em cache das listagens da tabela (após inserções e exclusões)"""
+    _cache_contagens.invalidar_prefixo(tabela)
+
+
+class Listagem:
+    """Listagem paginada do painel: projeção explícita, ordenação por colunas indexadas e keyset.
+
+    origem é a tabela principal (com alias, se houver) e juncoes as junções usadas só na
+    projeção; os filtros devem se referir à tabela principal. ordenaveis mapeia o nome
+    aceito em ?ordem= para a coluna SQL, e tanto essas colunas quanto a chave precisam
+    estar na projeção, pois o cursor guarda os valores da última linha exibida. Colunas
+    ENUM não servem: o ORDER BY usa a posição na lista e o cursor compara o texto.
+    """
+
+    def __init__(self, origem, colunas, chave, ordenaveis, ordem_padrao, direcao_padrao='desc', juncoes=''):
+        self.origem = origem
+        self.tabela = origem.split()[0]
+        self.colunas = colunas
+        self.chave = chave
+        self.ordenaveis = ordenaveis
+        self.ordem_padrao = ordem_padrao
+        self.direcao_padrao = direcao_padrao
+        self.juncoes = juncoes
+
+    def contar(self, cursor, where, params):
+        """Total de linhas do filtro, em cache por ADMIN_CONTAGEM_CACHE_TTL segundos"""
+        def calcular():
+            cursor.execute(f"SELECT COUNT(*) AS total FROM {self.origem} WHERE {where}", params)
+            linha = cursor.fetchone()
+            return linha['total'] if isinstance(linha, dict) else linha[0]
+        return _cache_contagens.obter_ou_calcular((self.tabela, where, tuple(params)), calcular)
+
+    def paginar(self, cursor, where, params, args, endpoint):
+        """Uma página da listagem conforme ?ordem=, ?dir=, ?cursor= e ?por_pagina=; retorna (linhas, paginacao)"""
+        ordem = args.get('ordem') if args.get('ordem') in self.ordenaveis else self.ordem_padrao
+        direcao = args.get('dir') if args.get('dir') in ('asc', 'desc') else self.direcao_padrao
+        por_pagina = obter_tamanho_pagina(args.get('por_pagina'), Config.ADMIN_ITENS_POR_PAGINA,
+                                          Config.ADMIN_ITENS_POR_PAGINA_MAX)
+        coluna = self.ordenaveis[ordem]
+        campo, campo_chave = coluna.split('.')[-1], self.chave.split('.')[-1]
+
+        # Cursores de outra ordenação (links antigos) voltam para a primeira página
+        posicao = decodificar_cursor(args.get('cursor'))
+        if not (posicao and posicao.get('ordem') == ordem and posicao.get('dir') == direcao
+                and 'valor' in posicao and 'id' in posicao):
+            posicao = None
+        anterior = bool(posicao and posicao.get('volta'))
+        crescente = (direcao == 'asc') != anterior
+
+        query = f"SELECT {self.colunas} FROM {self.origem} {self.juncoes} WHERE {where}"
+        params_pagina = list(params)
+        if posicao:
+            comparador = '>' if crescente else '<'
+            query += f" AND ({coluna} {comparador} %s OR ({coluna} = %s AND {self.chave} {comparador} %s))"
+            params_pagina.extend([posicao['valor'], posicao['valor'], posicao['id']])
+        sentido = 'ASC' if crescente else 'DESC'
+        query += f" ORDER BY {coluna} {sentido}, {self.chave} {sentido} LIMIT %s"
+        params_pagina.append(por_pagina + 1)
+        cursor.execute(query, params_pagina)
+        linhas = cursor.fetchall()
+
+        mais_resultados = len(linhas) > por_pagina
+        linhas = linhas[:por_pagina]
+        if anterior:
+            linhas.reverse()
+            tem_anterior, tem_proxima = mais_resultados, True
+        else:
+            tem_anterior, tem_proxima = posicao is not None, mais_resultados
+
+        filtros = {k: v for k, v in args.to_dict().items() if k != 'cursor'}
+
+        def url_pagina(linha, volta):
+            token = codificar_cursor({'ordem': ordem, 'dir': direcao, 'volta': volta,
+                                      'valor': linha[campo], 'id': linha[campo_chave]})
+            return url_for(endpoint, **filtros, cursor=token)
+
+        def url_ordenar(nome):
+            if nome == ordem:
+                nova = 'asc' if direcao == 'desc' else 'desc'
+            else:
+                nova = self.direcao_padrao if nome == self.ordem_padrao else 'asc'
+            return url_for(endpoint, **{**filtros, 'ordem': nome, 'dir': nova})
+
+        return linhas, {
+            'total': self.contar(cursor, where, params),
+            'por_pagina': por_pagina,
+            'ordem': ordem,
+            'dir': direcao,
+            'urls_ordenar': {nome: url_ordenar(nome) for nome in self.ordenaveis},
+            'url_anterior': url_pagina(linhas[0], True) if linhas and tem_anterior else None,
+            'url_proxima': url_pagina(linhas[-1], False) if linhas and tem_proxima else None,
+        }
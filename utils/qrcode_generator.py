@@ -1,52 +1,96 @@
 import qrcode
+import qrcode.image.svg
 import io
 import base64
+from functools import lru_cache
 from config import Config
 
-def gerar_qrcode_pix(valor_total):
-    """Gera QR Code e código Copia e Cola PIX com base no valor total"""
-    
-    def emv(id, valor):
-        tamanho = str(len(valor)).zfill(2)
-        return f"{id}{tamanho}{valor}"
-
-    merchant_account = emv("00", "br.gov.bcb.pix") + emv("01", Config.PIX_CHAVE)
-    merchant_info = emv("26", merchant_account)
-    transaction_amount = emv("54", f"{valor_total:.2f}")
-    txid = emv("05", f"GHCP{int(valor_total * 100)}")
-
-    payload = (
-        emv("00", "01")
-        + emv("01", "12")
-        + merchant_info
-        + emv("52", "0000")
-        + emv("53", "986")
-        + transaction_amount
-        + emv("58", "BR")
-        + emv("59", Config.PIX_NOME)
-        + emv("60", Config.PIX_CIDADE)
-        + emv("62", txid)
+
+def _emv(id, valor):
+    tamanho = str(len(valor)).zfill(2)
+    return f"{id}{tamanho}{valor}"
+
+
+def _montar_tabela_crc(polinomio=0x1021):
+    tabela = []
+    for byte in range(256):
+        resultado = byte << 8
+        for _ in range(8):
+            resultado = ((resultado << 1) ^ polinomio) if resultado & 0x8000 else (resultado << 1)
+        tabela.append(resultado & 0xFFFF)
+    return tuple(tabela)
+
+
+# CRC16-CCITT (polinômio 0x1021) por tabela: um acesso por byte em vez de 8 iterações
+_TABELA_CRC = _montar_tabela_crc()
+
+
+def crc16(dados, resultado=0xFFFF):
+    """CRC16-CCITT de `dados` (bytes), continuando de `resultado`"""
+    for byte in dados:
+        resultado = ((resultado << 8) & 0xFFFF) ^ _TABELA_CRC[(resultado >> 8) ^ byte]
+    return resultado
+
+
+# Partes fixas do payload, montadas uma única vez: só valor e txid mudam por cobrança
+_PREFIXO = (
+    _emv("00", "01")
+    + _emv("01", "12")
+    + _emv("26", _emv("00", "br.gov.bcb.pix") + _emv("01", Config.PIX_CHAVE))
+    + _emv("52", "0000")
+    + _emv("53", "986")
+)
+_RECEBEDOR = _emv("58", "BR") + _emv("59", Config.PIX_NOME) + _emv("60", Config.PIX_CIDADE)
+_CRC_PREFIXO = crc16(_PREFIXO.encode("utf-8"))
+
+
+def montar_payload(valor_total, txid=None):
+    """Código PIX Copia e Cola (BR Code) para o valor informado"""
+    txid = txid or f"GHCP{int(valor_total * 100)}"
+    variavel = _emv("54", f"{valor_total:.2f}") + _RECEBEDOR + _emv("62", _emv("05", txid)) + "6304"
+    resultado = crc16(variavel.encode("utf-8"), _CRC_PREFIXO)
+    return f"{_PREFIXO}{variavel}{resultado:04X}"
+
+
+def _qr(payload, compacto):
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=4 if compacto else 10,
+        border=2 if compacto else 4,
     )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr
 
-    def crc16(payload):
-        polinomio = 0x1021
-        resultado = 0xFFFF
-        payload += "6304"
-        for byte in bytearray(payload, "utf-8"):
-            resultado ^= byte << 8
-            for _ in range(8):
-                if resultado & 0x8000:
-                    resultado = (resultado << 1) ^ polinomio
-                else:
-                    resultado <<= 1
-                resultado &= 0xFFFF
-        return f"{payload}{resultado:04X}"
-
-    copia_cola = crc16(payload)
-
-    img = qrcode.make(copia_cola)
+
+def gerar_png(payload, compacto=False):
+    """PNG do QR Code (bytes), sem cache: para payloads únicos, como os com txid por pedido"""
+    img = _qr(payload, compacto).make_image()
     buffer = io.BytesIO()
     img.save(buffer, format="PNG")
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=Config.PIX_QR_CACHE)
+def renderizar_png(payload, compacto=False):
+    """PNG do QR Code (bytes), em cache pelo payload"""
+    return gerar_png(payload, compacto)
+
+
+@lru_cache(maxsize=Config.PIX_QR_CACHE)
+def renderizar_svg(payload, compacto=False):
+    """SVG do QR Code (texto, um único <path>), em cache pelo payload"""
+    img = _qr(payload, compacto).make_image(image_factory=qrcode.image.svg.SvgPathImage)
+    return img.to_string(encoding="unicode")
+
+
+def gerar_qrcode_pix(valor_total, formato="png", compacto=False, txid=None):
+    """Gera QR Code e código Copia e Cola PIX com base no valor total.
 
-    return qr_base64, copia_cola
\ No newline at end of file
+    Retorna (qr, copia_cola): qr é o PNG em base64 ou, com formato='svg', o markup SVG.
+    """
+    copia_cola = montar_payload(valor_total, txid)
+    if formato == "svg":
+        return renderizar_svg(copia_cola, compacto), copia_cola
+    qr_base64 = base64.b64encode(renderizar_png(copia_cola, compacto)).decode("utf-8")
+    return qr_base64, copia_cola
@@ -0,0 +1,44 @@
+"""
+Tarefas periódicas em segundo plano (threads daemon dentro do processo web).
+Cada tarefa é registrada uma única vez por processo, mesmo que create_app()
+seja chamado de novo.
+"""
+
+import threading
+import time
+
+_tarefas = {}
+_lock = threading.Lock()
+
+
+def _executar(nome, funcao):
+    inicio = time.monotonic()
+    try:
+        resultado = funcao()
+        if resultado:
+            print(f"⏱️ Tarefa '{nome}': {resultado} ({time.monotonic() - inicio:.2f}s)")
+    except Exception as e:
+        print(f"❌ Erro na tarefa '{nome}': {e}")
+
+
+def _executar_periodicamente(nome, intervalo, funcao, parar, imediata):
+    if imediata:
+        _executar(nome, funcao)
+    while not parar.wait(intervalo):
+        _executar(nome, funcao)
+
+
+def iniciar_tarefa_periodica(nome, intervalo, funcao, imediata=False):
+    """Executa funcao() a cada `intervalo` segundos (e logo ao iniciar, se imediata); retorna o Event que encerra a tarefa"""
+    with _lock:
+        if nome in _tarefas:
+            return _tarefas[nome]
+        parar = threading.Event()
+        threading.Thread(
+            target=_executar_periodicamente,
+            args=(nome, intervalo, funcao, parar, imediata),
+            name=f'tarefa-{nome}',
+            daemon=True
+        ).start()
+        _tarefas[nome] = parar
+        return parar
@@ -0,0 +1,135 @@
+"""
+Recepção de uploads em streaming.
+
+O parser multipart do Werkzeug pede um arquivo de destino para cada campo de
+upload (Request._get_file_stream) e escreve nele bloco a bloco. Aqui esse
+destino é um arquivo temporário já na pasta de uploads: o SHA-256 é calculado
+durante a escrita, o tipo é conferido pelos primeiros bytes e o limite por
+arquivo é aplicado antes de gravar o excedente. Ao final, o temporário é
+renomeado (atômico) para o nome definitivo, sem cópia extra.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import Config
+
+# Bytes necessários para reconhecer qualquer formato aceito (WEBP precisa de 12)
+TAMANHO_CABECALHO = 12
+
+
+def detectar_tipo(cabecalho):
+    """Extensão correspondente aos primeiros bytes do arquivo, ou None se não for imagem aceita"""
+    if cabecalho.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if cabecalho.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if cabecalho[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class UploadEmDisco:
+    """Destino de escrita de um campo de arquivo: grava em disco enquanto o corpo chega"""
+
+    def __init__(self, limite=None):
+        os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+        self._arquivo = tempfile.NamedTemporaryFile(dir=Config.UPLOAD_FOLDER, suffix='.tmp', delete=False)
+        self._sha = hashlib.sha256()
+        self._cabecalho = b''
+        self._limite = limite or Config.UPLOAD_MAX_ARQUIVO
+        self.tamanho = 0
+        self.rejeitado = False
+        self.finalizado = False
+
+    @property
+    def tipo(self):
+        return None if self.rejeitado else detectar_tipo(self._cabecalho)
+
+    @property
+    def sha256(self):
+        return self._sha.hexdigest()
+
+    def write(self, dados):
+        if self.rejeitado:
+            return len(dados)  # o restante do campo é consumido sem ir para o disco
+
+        self.tamanho += len(dados)
+        if self.tamanho > self._limite:
+            self._descartar()
+            raise RequestEntityTooLarge(f'Arquivo maior que {self._limite // (1024 * 1024)}MB.')
+
+        if len(self._cabecalho) < TAMANHO_CABECALHO:
+            self._cabecalho += dados[:TAMANHO_CABECALHO - len(self._cabecalho)]
+            if len(self._cabecalho) >= TAMANHO_CABECALHO and detectar_tipo(self._cabecalho) is None:
+                self.rejeitado = True
+                self._descartar()
+                return len(dados)
+
+        self._sha.update(dados)
+        self._arquivo.write(dados)
+        return len(dados)
+
+    def promover(self, destino):
+        """Move o temporário para o destino; se o conteúdo já existe, apenas descarta a cópia"""
+        self._arquivo.close()
+        if os.path.exists(destino):
+            os.utime(destino)
+            self._descartar()
+        else:
+            os.replace(self._arquivo.name, destino)
+        self.finalizado = True
+
+    def _descartar(self):
+        self._arquivo.close()
+        try:
+            os.remove(self._arquivo.name)
+        except FileNotFoundError:
+            pass
+        self.finalizado = True
+
+    def close(self):
+        if not self.finalizado:
+            self._descartar()
+
+    # Interface de arquivo usada pelo Werkzeug/FileStorage
+    def seek(self, *args):
+        return 0 if self._arquivo.closed else self._arquivo.seek(*args)
+
+    def tell(self):
+        return self.tamanho if self._arquivo.closed else self._arquivo.tell()
+
+    def read(self, *args):
+        return b'' if self._arquivo.closed else self._arquivo.read(*args)
+
+    def flush(self):
+        if not self._arquivo.closed:
+            self._arquivo.flush()
+
+    def __getattr__(self, nome):
+        return getattr(self._arquivo, nome)
+
+
+class RequisicaoStreaming(Request):
+    """Request do Flask que grava campos de arquivo direto em UploadEmDisco"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = UploadEmDisco()
+        # Guardado aqui e não só em request.files: se um campo posterior estoura o
+        # limite, o parsing é interrompido e request.files nunca é preenchido.
+        self.__dict__.setdefault('_uploads', []).append(upload)
+        return upload
+
+    def close(self):
+        """Descarta os temporários não promovidos (Flask chama ao encerrar a requisição)"""
+        try:
+            super().close()
+        finally:
+            for upload in self.__dict__.pop('_uploads', []):
+                upload.close()